@@ -28,12 +28,12 @@ async def get_current_user(
     if token_data is None:
         raise UnauthorizedError("Невірний або прострочений токен")
     
-    # Перевіряємо, чи користувач існує в БД
-    user = await auth_service.get_user_by_id(token_data.user_id)
-    if not user:
+    # Перевіряємо, чи користувач існує (через кеш, згідно AUTH_USER_CHECK_MODE)
+    checked = await auth_service.check_token_user(token_data)
+    if checked is None:
         raise UnauthorizedError("Користувач не знайдений")
     
-    return token_data
+    return checked
 
 
 async def get_current_user_optional(
@@ -54,12 +54,8 @@ async def get_current_user_optional(
         if token_data is None:
             return None
         
-        # Перевіряємо, чи користувач існує в БД
-        user = await auth_service.get_user_by_id(token_data.user_id)
-        if not user:
-            return None
-        
-        return token_data
+        # Перевіряємо, чи користувач існує (через кеш, згідно AUTH_USER_CHECK_MODE)
+        return await auth_service.check_token_user(token_data)
     except Exception as e:
         logger.debug(f"Помилка при отриманні користувача (опціонально): {e}")
         return None
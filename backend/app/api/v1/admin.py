@@ -1,121 +1,129 @@
 """
 API endpoints для адмін панелі.
 """
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, Query
 from loguru import logger
 
 from app.api.dependencies import get_current_admin
 from app.models.auth import TokenData
+from app.models.order import BulkOrderStatusUpdate, ORDER_STATUSES, PAYMENT_STATUSES
 from app.services.order_service import get_order_service, OrderService
-from app.services.product_service import get_product_service, ProductService
-from app.core.database import MongoDB
+from app.services.stats_service import get_stats_service, StatsService, admin_stats_cache
+from app.services.auth_service import user_auth_cache, user_check_stats
+from app.services.review_service import pending_count_cache
+from app.core.config import settings
+from app.core.db_monitoring import command_stats, pool_stats
+from app.core.logging import logging_stats
+from app.utils.security import revoked_sessions_count, token_cache_stats
+from app.utils.rate_limit import rate_limiter
+from app.services.analytics_service import get_analytics_service, AnalyticsService
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=TimedRoute)
 
 
 @router.get("/stats")
 async def get_admin_stats(
+    refresh: bool = Query(False, description="Оминути кеш і перерахувати статистику"),
     current_admin: TokenData = Depends(get_current_admin),
-    order_service: OrderService = Depends(get_order_service),
-    product_service: ProductService = Depends(get_product_service),
+    stats_service: StatsService = Depends(get_stats_service),
 ):
     """
     Отримує статистику для адмін панелі.
+    Відповідь кешується на короткий час; refresh=true оминає кеш.
     Тільки для адміністраторів.
     """
-    db = MongoDB.get_database()
-    
-    # Статистика замовлень
-    orders_collection = db.orders
-    products_collection = db.products
-    users_collection = db.users
-    
-    # Загальна кількість замовлень
-    total_orders = await orders_collection.count_documents({})
-    
-    # Замовлення за статусами
-    orders_by_status = {}
-    statuses = ["new", "processing", "shipped", "delivered", "cancelled"]
-    for status in statuses:
-        count = await orders_collection.count_documents({"order_status": status})
-        orders_by_status[status] = count
-    
-    # Замовлення за статусом оплати
-    paid_orders = await orders_collection.count_documents({"payment_status": "paid"})
-    pending_orders = await orders_collection.count_documents({"payment_status": "pending"})
-    
-    # Загальна сума всіх замовлень
-    pipeline_total = [
-        {"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}
-    ]
-    total_revenue_result = await orders_collection.aggregate(pipeline_total).to_list(length=1)
-    total_revenue = total_revenue_result[0]["total"] if total_revenue_result else 0.0
-    
-    # Сума оплачених замовлень
-    pipeline_paid = [
-        {"$match": {"payment_status": "paid"}},
-        {"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}
-    ]
-    paid_revenue_result = await orders_collection.aggregate(pipeline_paid).to_list(length=1)
-    paid_revenue = paid_revenue_result[0]["total"] if paid_revenue_result else 0.0
-    
-    # Статистика товарів
-    total_products = await products_collection.count_documents({})
-    active_products = await products_collection.count_documents({"is_active": True})
+    stats = await stats_service.get_admin_stats(force_refresh=refresh)
     
-    # Товари з низьким залишком
-    low_stock_products = await products_collection.count_documents({
-        "stock": {"$lt": 10},
-        "is_active": True
-    })
-    
-    # Статистика користувачів
-    total_users = await users_collection.count_documents({})
-    admin_users = await users_collection.count_documents({"is_admin": True})
-    
-    # Останні замовлення (5)
-    recent_orders = await orders_collection.find({}).sort("created_at", -1).limit(5).to_list(length=5)
-    
-    # Серіалізуємо останні замовлення
-    serialized_recent_orders = []
-    for order in recent_orders:
-        serialized_order = {
-            "id": str(order["_id"]),
-            "order_status": order.get("order_status", "new"),
-            "payment_status": order.get("payment_status", "pending"),
-            "total_amount": order.get("total_amount", 0.0),
-            "created_at": order.get("created_at").isoformat() if order.get("created_at") else None,
-            "email": order.get("email", ""),
-        }
-        serialized_recent_orders.append(serialized_order)
+    logger.info(f"Адмін {current_admin.email} отримав статистику")
+    return stats
+
+
+@router.get("/analytics/revenue")
+async def get_revenue_analytics(
+    granularity: str = Query("day", pattern="^(day|week|month)$", description="Період: day, week або month"),
+    date_from: Optional[datetime] = Query(None, description="Початок діапазону"),
+    date_to: Optional[datetime] = Query(None, description="Кінець діапазону"),
+    current_admin: TokenData = Depends(get_current_admin),
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Отримує виручку та кількість замовлень по днях, тижнях або місяцях.
+    Тільки для адміністраторів.
+    """
+    analytics = await analytics_service.get_revenue_analytics(
+        granularity=granularity,
+        date_from=date_from,
+        date_to=date_to,
+    )
     
-    stats = {
-        "orders": {
-            "total": total_orders,
-            "by_status": orders_by_status,
-            "paid": paid_orders,
-            "pending": pending_orders,
-        },
-        "revenue": {
-            "total": total_revenue,
-            "paid": paid_revenue,
-            "pending": total_revenue - paid_revenue,
-        },
-        "products": {
-            "total": total_products,
-            "active": active_products,
-            "low_stock": low_stock_products,
+    logger.info(f"Адмін {current_admin.email} отримав аналітику виручки ({granularity})")
+    return analytics
+
+
+@router.get("/diagnostics/caches")
+async def get_cache_diagnostics(
+    current_admin: TokenData = Depends(get_current_admin),
+):
+    """
+    Статистика кешів процесу (для поточного воркера).
+    Тільки для адміністраторів.
+    """
+    return {
+        "admin_stats": admin_stats_cache.stats(),
+        "pending_reviews_count": pending_count_cache.stats(),
+        "auth_users": {
+            **user_auth_cache.stats(),
+            **user_check_stats,
+            "mode": settings.AUTH_USER_CHECK_MODE,
         },
-        "users": {
-            "total": total_users,
-            "admins": admin_users,
+        "decoded_tokens": token_cache_stats(),
+        "revoked_sessions": revoked_sessions_count(),
+        "logging": logging_stats(),
+        "rate_limit": {
+            "backend": rate_limiter.backend_name,
+            "rejected": rate_limiter.rejected,
         },
-        "recent_orders": serialized_recent_orders,
     }
-    
-    logger.info(f"Адмін {current_admin.email} отримав статистику")
-    return stats
+
+
+@router.get("/diagnostics/pool")
+async def get_pool_diagnostics(
+    current_admin: TokenData = Depends(get_current_admin),
+):
+    """
+    Статистика пулу з'єднань MongoDB по серверах (для поточного воркера).
+    Тільки для адміністраторів.
+    """
+    return {
+        "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+        "servers": pool_stats.stats(),
+    }
+
+
+@router.get("/diagnostics/queries")
+async def get_query_diagnostics(
+    limit: int = Query(50, ge=1, le=500, description="Максимум записів у кожному списку"),
+    reset: bool = Query(False, description="Очистити статистику після читання"),
+    current_admin: TokenData = Depends(get_current_admin),
+):
+    """
+    Статистика команд MongoDB по методах сервісів, останні повільні запити
+    та результати explain (для поточного воркера).
+    Тільки для адміністраторів.
+    """
+    result = {
+        "monitoring_enabled": settings.MONGODB_COMMAND_MONITORING,
+        "slow_query_ms": settings.MONGODB_SLOW_QUERY_MS,
+        "explain_sample_rate": settings.MONGODB_EXPLAIN_SAMPLE_RATE,
+        **command_stats.stats(limit),
+    }
+    if reset:
+        command_stats.reset()
+    return result
 
 
 @router.put("/orders/{order_id}/status")
@@ -129,7 +137,7 @@ async def update_order_status(
     Оновлює статус замовлення.
     Тільки для адміністраторів.
     """
-    valid_statuses = ["new", "processing", "shipped", "delivered", "cancelled"]
+    valid_statuses = ORDER_STATUSES
     if order_status not in valid_statuses:
         from app.core.exceptions import ValidationError
         raise ValidationError(f"Невірний статус. Дозволені: {', '.join(valid_statuses)}")
@@ -155,7 +163,7 @@ async def update_payment_status(
     Оновлює статус оплати замовлення.
     Тільки для адміністраторів.
     """
-    valid_statuses = ["pending", "paid", "failed", "refunded"]
+    valid_statuses = PAYMENT_STATUSES
     if payment_status not in valid_statuses:
         from app.core.exceptions import ValidationError
         raise ValidationError(f"Невірний статус оплати. Дозволені: {', '.join(valid_statuses)}")
@@ -169,3 +177,27 @@ async def update_payment_status(
     
     return order
 
+
+
+@router.post("/orders/bulk-status")
+async def bulk_update_order_status(
+    bulk_data: BulkOrderStatusUpdate,
+    current_admin: TokenData = Depends(get_current_admin),
+    order_service: OrderService = Depends(get_order_service),
+):
+    """
+    Масово оновлює статуси замовлень за списком ID, фільтром
+    або набором окремих змін. Повертає результат для кожного замовлення.
+    Тільки для адміністраторів.
+    """
+    logger.info(f"Адмін {current_admin.email} виконує масову зміну статусів замовлень")
+    
+    result = await order_service.bulk_update_order_status(
+        order_ids=bulk_data.order_ids,
+        filter_query=bulk_data.filter.to_mongo_query() if bulk_data.filter else None,
+        updates=[u.model_dump() for u in bulk_data.updates] if bulk_data.updates is not None else None,
+        order_status=bulk_data.order_status,
+        payment_status=bulk_data.payment_status,
+    )
+    
+    return result
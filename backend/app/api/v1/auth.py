@@ -1,19 +1,21 @@
 """
 API endpoints для автентифікації.
 """
-from datetime import timedelta
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from loguru import logger
 from pydantic import BaseModel, Field
 
-from app.models.auth import LoginRequest, RegisterRequest, TokenResponse
+from app.api.dependencies import get_current_user
+from app.models.auth import LoginRequest, RegisterRequest, TokenData, TokenResponse
 from app.models.user import UserResponse
 from app.services.auth_service import get_auth_service, AuthService
+from app.services.token_service import get_token_service, TokenService
 from app.core.exceptions import UnauthorizedError
-from app.utils.security import decode_token, create_access_token
-from app.core.config import settings
+from app.utils.security import decode_token
+from app.utils.rate_limit import client_ip, login_rules, rate_limiter, register_rules
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 
 
 class RefreshTokenRequest(BaseModel):
@@ -24,6 +26,7 @@ class RefreshTokenRequest(BaseModel):
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(
     user_data: RegisterRequest,
+    request: Request,
     auth_service: AuthService = Depends(get_auth_service),
 ):
     """
@@ -31,6 +34,9 @@ async def register(
     """
     logger.info(f"Спроба реєстрації: {user_data.email}")
     
+    # Ліміт перевіряється до хешування пароля
+    await rate_limiter.enforce(register_rules(client_ip(request)))
+    
     # Створюємо користувача через UserCreate
     from app.models.user import UserCreate
     user_create = UserCreate(
@@ -56,6 +62,7 @@ async def register(
 @router.post("/login", response_model=TokenResponse)
 async def login(
     login_data: LoginRequest,
+    request: Request,
     auth_service: AuthService = Depends(get_auth_service),
 ):
     """
@@ -63,6 +70,9 @@ async def login(
     """
     logger.info(f"Спроба входу: {login_data.email}")
     
+    # Ліміт перевіряється до перевірки пароля (bcrypt)
+    await rate_limiter.enforce(login_rules(client_ip(request), login_data.email))
+    
     tokens = await auth_service.login(
         email=login_data.email,
         password=login_data.password,
@@ -75,9 +85,12 @@ async def login(
 async def refresh_token(
     refresh_data: RefreshTokenRequest,
     auth_service: AuthService = Depends(get_auth_service),
+    token_service: TokenService = Depends(get_token_service),
 ):
     """
-    Оновлення access token за допомогою refresh token.
+    Оновлення токенів за допомогою refresh token.
+    Refresh token одноразовий: повертається нова пара токенів, а повторне
+    використання старого токена відкликає всю сесію.
     """
     logger.info("Спроба оновлення токена")
     
@@ -86,26 +99,36 @@ async def refresh_token(
     if token_data is None:
         raise UnauthorizedError("Невірний або прострочений refresh token")
     
-    # Перевіряємо, чи користувач існує
-    user = await auth_service.get_user_by_id(token_data.user_id)
-    if not user:
+    # Перевіряємо, чи користувач існує, та беремо актуальну роль
+    checked = await auth_service.check_token_user(token_data)
+    if checked is None:
         raise UnauthorizedError("Користувач не знайдений")
     
-    # Створюємо новий access token
-    new_token_data = {
-        "sub": str(user["_id"]),
-        "email": user["email"],
-        "is_admin": user.get("is_admin", False),
-    }
-    
-    access_token = create_access_token(
-        new_token_data,
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-    
-    return TokenResponse(
-        access_token=access_token,
-        refresh_token=refresh_data.refresh_token,  # Refresh token залишається незмінним
-        token_type="bearer",
-    )
+    return await token_service.rotate(checked)
 
+
+@router.post("/logout", status_code=204)
+async def logout(
+    current_user: TokenData = Depends(get_current_user),
+    token_service: TokenService = Depends(get_token_service),
+):
+    """
+    Вихід: відкликає поточну сесію (її refresh та access токени).
+    """
+    if current_user.sid:
+        await token_service.revoke_session(current_user.sid, current_user.user_id)
+    logger.info(f"Користувач {current_user.email} вийшов із системи")
+    return None
+
+
+@router.post("/logout-all", status_code=204)
+async def logout_all(
+    current_user: TokenData = Depends(get_current_user),
+    token_service: TokenService = Depends(get_token_service),
+):
+    """
+    Вихід з усіх пристроїв: відкликає всі сесії користувача.
+    """
+    await token_service.revoke_user_sessions(current_user.user_id)
+    logger.info(f"Користувач {current_user.email} вийшов з усіх сесій")
+    return None
@@ -8,9 +8,10 @@ from loguru import logger
 
 from app.services.product_service import get_product_service, ProductService
 from app.core.database import MongoDB
+from app.core.timing import TimedRoute
 from bson import ObjectId
 
-router = APIRouter(prefix="/calculator", tags=["calculator"])
+router = APIRouter(prefix="/calculator", tags=["calculator"], route_class=TimedRoute)
 
 
 class DeviceInput(BaseModel):
@@ -42,7 +43,7 @@ async def calculate_power_bank(request: CalculatorRequest):
     """
     try:
         product_service = get_product_service()
-        db = MongoDB.get_database()
+        db = MongoDB.get_catalog_database()
         
         # Розраховуємо необхідну ємність
         total_capacity_needed = 0
@@ -132,7 +133,7 @@ async def calculate_ups(
     """
     try:
         product_service = get_product_service()
-        db = MongoDB.get_database()
+        db = MongoDB.get_catalog_database()
         
         # Розраховуємо необхідну потужність UPS
         # Додаємо запас 30% для надійності
@@ -10,9 +10,10 @@ from app.services.order_service import get_order_service, OrderService
 from app.services.payment_service import PaymentService
 from app.api.dependencies import get_current_user, get_current_admin, get_current_user_optional
 from app.models.auth import TokenData
+from app.core.timing import TimedRoute
 from bson import ObjectId
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=TimedRoute)
 
 
 @router.post("", response_model=OrderResponse, status_code=201)
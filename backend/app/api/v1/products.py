@@ -12,8 +12,9 @@ from app.models.rating import RatingCreate, RatingResponse
 from app.services.product_service import get_product_service, ProductService
 from app.api.dependencies import get_current_admin, get_current_user_optional
 from app.models.auth import TokenData
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=TimedRoute)
 
 
 @router.get("", response_model=PaginatedResponse)
@@ -6,12 +6,19 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.responses import JSONResponse
 from loguru import logger
 
-from app.models.review import ReviewCreate, ReviewUpdate, ReviewResponse
+from app.models.review import (
+    ReviewCreate,
+    ReviewUpdate,
+    ReviewResponse,
+    BulkReviewModeration,
+    ClusterModeration,
+)
 from app.services.review_service import get_review_service, ReviewService
-from app.api.dependencies import get_current_admin, get_current_user_optional
+from app.api.dependencies import get_current_admin, get_current_user, get_current_user_optional
 from app.models.auth import TokenData
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/reviews", tags=["reviews"])
+router = APIRouter(prefix="/reviews", tags=["reviews"], route_class=TimedRoute)
 
 
 @router.get("/product/{product_id}")
@@ -34,6 +41,46 @@ async def get_product_reviews(
     return JSONResponse(content=reviews)
 
 
+@router.get("/product/{product_id}/page")
+async def get_product_reviews_page(
+    product_id: str,
+    sort: str = Query("newest", pattern="^(newest|rating_desc|rating_asc|helpful)$", description="Сортування"),
+    cursor: Optional[str] = Query(None, description="Курсор наступної сторінки"),
+    limit: int = Query(20, ge=1, le=100, description="Кількість відгуків на сторінці"),
+    approved_only: bool = Query(True, description="Тільки схвалені відгуки"),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Отримує сторінку відгуків для товару (cursor пагінація).
+    Сортування: newest, rating_desc, rating_asc, helpful.
+    Доступно всім користувачам.
+    """
+    page = await review_service.get_reviews_page(
+        product_id=product_id,
+        approved_only=approved_only,
+        sort=sort,
+        cursor=cursor,
+        limit=limit,
+    )
+    
+    return JSONResponse(content=page)
+
+
+@router.post("/{review_id}/helpful")
+async def mark_review_helpful(
+    review_id: str,
+    current_user: TokenData = Depends(get_current_user),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Позначає відгук як корисний.
+    Доступно авторизованим користувачам (один голос на відгук).
+    """
+    result = await review_service.mark_helpful(review_id, current_user.user_id)
+    
+    return JSONResponse(content=result)
+
+
 @router.post("/product/{product_id}")
 async def create_review(
     product_id: str,
@@ -138,6 +185,80 @@ async def get_pending_reviews(
     return JSONResponse(content=reviews)
 
 
+@router.get("/admin/pending/page")
+async def get_pending_reviews_page(
+    cursor: Optional[str] = Query(None, description="Курсор наступної сторінки"),
+    limit: int = Query(50, ge=1, le=100),
+    current_admin: TokenData = Depends(get_current_admin),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Отримує сторінку черги модерації (cursor пагінація) та кількість відгуків у черзі.
+    Тільки для адміністраторів.
+    """
+    page = await review_service.get_pending_reviews_page(cursor=cursor, limit=limit)
+    return JSONResponse(content=page)
+
+
+@router.post("/admin/moderate/bulk")
+async def bulk_moderate_reviews(
+    moderation_data: BulkReviewModeration,
+    current_admin: TokenData = Depends(get_current_admin),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Масово модерує відгуки (схвалює або відхиляє).
+    Тільки для адміністраторів.
+    """
+    logger.info(f"Адмін {current_admin.email} масово модерує {len(moderation_data.decisions)} відгуків")
+    
+    result = await review_service.bulk_moderate_reviews(
+        [decision.model_dump() for decision in moderation_data.decisions]
+    )
+    
+    return JSONResponse(content=result)
+
+
+@router.get("/admin/clusters/{cluster_id}")
+async def get_duplicate_cluster(
+    cluster_id: str,
+    pending_only: bool = Query(True, description="Лише відгуки, що чекають модерації"),
+    current_admin: TokenData = Depends(get_current_admin),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Отримує відгуки кластера майже однакових відгуків.
+    Тільки для адміністраторів.
+    """
+    reviews = await review_service.get_duplicate_cluster(cluster_id, pending_only=pending_only)
+    return JSONResponse(content=reviews)
+
+
+@router.post("/admin/clusters/{cluster_id}/moderate")
+async def moderate_duplicate_cluster(
+    cluster_id: str,
+    moderation_data: ClusterModeration,
+    current_admin: TokenData = Depends(get_current_admin),
+    review_service: ReviewService = Depends(get_review_service),
+):
+    """
+    Схвалює або відхиляє всі немодеровані відгуки кластера.
+    Тільки для адміністраторів.
+    """
+    logger.info(
+        f"Адмін {current_admin.email} модерує кластер відгуків {cluster_id}: "
+        f"{'схвалено' if moderation_data.is_approved else 'відхилено'}"
+    )
+    
+    result = await review_service.moderate_duplicate_cluster(
+        cluster_id,
+        is_approved=moderation_data.is_approved,
+        moderator_comment=moderation_data.moderator_comment,
+    )
+    
+    return JSONResponse(content=result)
+
+
 @router.post("/admin/{review_id}/moderate")
 async def moderate_review(
     review_id: str,
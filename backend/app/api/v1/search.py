@@ -7,8 +7,9 @@ from typing import List
 
 from app.services.product_service import get_product_service, ProductService
 from app.models.product import ProductResponse
+from app.core.timing import TimedRoute
 
-router = APIRouter(prefix="/search", tags=["search"])
+router = APIRouter(prefix="/search", tags=["search"], route_class=TimedRoute)
 
 
 @router.get("/products", response_model=List[ProductResponse])
@@ -21,7 +22,7 @@ async def search_products(
     Розумний пошук товарів за назвою, описом та типом батареї.
     Доступно всім користувачам.
     """
-    logger.info(f"Пошук товарів: '{q}'")
+    logger.debug(f"Пошук товарів: '{q}'")
     
     products = await product_service.search_products(search_query=q, limit=limit)
     
@@ -4,7 +4,7 @@
 """
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List
+from typing import Dict, List, Literal, Optional
 import json
 
 
@@ -15,15 +15,69 @@ class Settings(BaseSettings):
     APP_NAME: str = "PowerCore API"
     APP_VERSION: str = "1.0.0"
     
+    # Продакшн сервер (gunicorn.conf.py)
+    WEB_BIND: str = "0.0.0.0:8000"
+    WEB_WORKERS: int = 0  # 0 - за кількістю CPU (async воркери, один на ядро)
+    WEB_WORKERS_PER_CORE: float = 1.0  # Множник для автоматичної кількості воркерів
+    WEB_MAX_WORKERS: int = 0  # Верхня межа для автоматичної кількості (0 - без межі)
+    WEB_TIMEOUT: int = 60  # Воркер, що не відповідає довше, перезапускається
+    WEB_GRACEFUL_TIMEOUT: int = 30  # Час на завершення запитів при зупинці
+    WEB_KEEPALIVE: int = 5  # Keep-alive з'єднань (секунд)
+    WEB_MAX_REQUESTS: int = 10000  # Перезапуск воркера після N запитів (0 - вимкнено)
+    WEB_MAX_REQUESTS_JITTER: int = 1000  # Випадковий розкид, щоб воркери не перезапускались разом
+    WEB_PRELOAD_APP: bool = True  # Імпортувати додаток у master до fork
+    
     # MongoDB налаштування
     MONGODB_URL: str = "mongodb://localhost:27017/"
     MONGODB_DB_NAME: str = "powercore"
+    MONGODB_MAX_POOL_SIZE: int = 100  # Максимум з'єднань у пулі (на процес)
+    MONGODB_MIN_POOL_SIZE: int = 0  # Скільки з'єднань тримати відкритими завжди
+    MONGODB_MAX_CONNECTING: int = 2  # Скільки з'єднань пул може встановлювати одночасно
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None  # Закривати з'єднання, що простоюють довше
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # Скільки чекати на вільне з'єднання
+    MONGODB_COMPRESSORS: str = ""  # Стиснення в порядку пріоритету, напр. "zstd,snappy,zlib"
+    MONGODB_ZLIB_COMPRESSION_LEVEL: int = 6  # Рівень zlib (-1..9)
+    MONGODB_CATALOG_READ_PREFERENCE: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"  # Read preference для каталогу товарів
+    MONGODB_ORDERS_WRITE_CONCERN: str = ""  # w для замовлень: "majority", "1" (порожньо - за замовчуванням)
+    MONGODB_ORDERS_WRITE_JOURNAL: Optional[bool] = None  # j для замовлень
+    MONGODB_COMMAND_MONITORING: bool = True  # Статистика команд по методах сервісів
+    MONGODB_SLOW_QUERY_MS: int = 100  # Команди, довші за це, логуються з формою фільтра
+    MONGODB_EXPLAIN_SAMPLE_RATE: float = 0.0  # Діагностика: частка повільних команд для explain (0 - вимкнено)
+    MONGODB_EXPLAIN_INTERVAL_SECONDS: float = 10.0  # Як часто виконувати відібрані explain
     
     # JWT налаштування
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # Абсолютний термін сесії (ротація його не продовжує)
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 30  # Вікно, в якому обміняний токен повертає той самий наступний
+    TOKEN_CACHE_ENABLED: bool = True  # Кешувати перевірені токени до їх exp
+    TOKEN_CACHE_SIZE: int = 10000  # Максимум токенів у кеші
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 15  # Як часто воркер підтягує відкликані сесії з БД
+    
+    # Хешування паролів
+    BCRYPT_ROUNDS: int = 12  # Вартість bcrypt (при зміні хеші оновлюються під час входу)
+    PASSWORD_HASH_WORKERS: int = 4  # Потоків для bcrypt (обмежує одночасні хешування)
+    
+    # Перевірка користувача з токена: always - запит до БД на кожен запит,
+    # cached - через кеш, off - довіряти токену
+    AUTH_USER_CHECK_MODE: Literal["always", "cached", "off"] = "cached"
+    AUTH_USER_CACHE_TTL_SECONDS: float = 60.0  # Скільки кешувати існування та роль користувача
+    AUTH_USER_CACHE_SIZE: int = 10000  # Максимум користувачів у кеші
+    
+    # Обмеження частоти входу та реєстрації (token bucket: burst + поповнення за хвилину)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "mongo"] = "memory"  # mongo - спільний ліміт для всіх воркерів
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100000  # Максимум ключів у пам'яті воркера
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Брати IP з X-Forwarded-For (за проксі)
+    RATE_LIMIT_LOGIN_IP_BURST: int = 20
+    RATE_LIMIT_LOGIN_IP_PER_MINUTE: float = 10.0
+    RATE_LIMIT_LOGIN_EMAIL_BURST: int = 5
+    RATE_LIMIT_LOGIN_EMAIL_PER_MINUTE: float = 2.0
+    RATE_LIMIT_REGISTER_IP_BURST: int = 5
+    RATE_LIMIT_REGISTER_IP_PER_MINUTE: float = 1.0
     
     # CORS налаштування
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:3001"]
@@ -39,9 +93,39 @@ class Settings(BaseSettings):
                 return [v]
         return v
     
+    # Статистика адмін панелі
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 3600  # Звірка лічильників дашборду
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300  # Оновлення денних підсумків замовлень
+    ADMIN_STATS_CACHE_TTL_SECONDS: float = 10.0  # Скільки статистика вважається свіжою
+    ADMIN_STATS_CACHE_STALE_SECONDS: float = 60.0  # Скільки ще віддавати застарілу під час оновлення
+    
+    # Відгуки
+    REVIEW_PENDING_COUNT_CACHE_SECONDS: float = 30.0  # Кеш кількості відгуків на модерацію
+    REVIEW_SUMMARY_LATEST_COUNT: int = 5  # Скільки останніх відгуків вбудовувати в товар
+    REVIEW_DUPLICATE_THRESHOLD: float = 0.8  # Схожість (0-1), з якої відгук вважається дублікатом
+    REVIEW_MINHASH_PERMUTATIONS: int = 64  # Довжина MinHash сигнатури
+    REVIEW_MINHASH_BANDS: int = 16  # Кількість LSH смуг (має ділити кількість перестановок)
+    
+    # Метрики Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str = ""  # Каталог для агрегації метрик воркерів gunicorn (порожньо - один процес)
+    METRICS_REFRESH_SECONDS: float = 5.0  # Як часто знімати стан пулу та кешів
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = 1.0  # Як часто вимірювати затримку event loop
+    
+    # Розбивка часу запитів
+    SERVER_TIMING_ENABLED: bool = True  # Заголовок Server-Timing (db, serialize, handler, validate, total)
+    SLOW_REQUEST_MS: int = 1000  # Запити, довші за це, логуються з розбивкою часу (0 - вимкнено)
+    SLOW_REQUEST_LOG_SAMPLE_RATE: float = 1.0  # Частка повільних запитів, що логуються
+    
     # Логування
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/powercore.log"
+    LOG_FORMAT: Literal["text", "json"] = "text"  # json - один JSON об'єкт на рядок
+    LOG_QUEUE_SIZE: int = 10000  # Розмір черги логів (0 - синхронний запис, з кольорами)
+    LOG_DIAGNOSE: bool = False  # Значення змінних у traceback (повільно, може розкрити дані)
+    LOG_BACKTRACE: bool = True  # Повний traceback
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0  # Частка запитів з INFO/DEBUG логами (WARNING+ завжди)
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # По префіксах шляху, напр. {"/api/v1/products": 0.05}
     
     class Config:
         env_file = ".env"
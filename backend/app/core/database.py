@@ -2,8 +2,10 @@
 Підключення до MongoDB через Motor (async driver).
 З retry-логікою для стійкості.
 """
-from typing import Optional
+import importlib.util
+from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, WriteConcern
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from loguru import logger
 from tenacity import (
@@ -13,6 +15,66 @@ from tenacity import (
     retry_if_exception_type,
 )
 from app.core.config import settings
+from app.core.db_monitoring import command_stats, pool_stats
+
+
+# Модулі, потрібні драйверу для кожного алгоритму стиснення
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+# Допустимі значення MONGODB_CATALOG_READ_PREFERENCE
+_READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def _available_compressors() -> List[str]:
+    """Стиснення з MONGODB_COMPRESSORS, для яких встановлені потрібні модулі."""
+    compressors = []
+    for name in (c.strip() for c in settings.MONGODB_COMPRESSORS.split(",") if c.strip()):
+        module = _COMPRESSOR_MODULES.get(name)
+        if module is None:
+            logger.warning(f"Невідомий алгоритм стиснення MongoDB: {name}")
+        elif importlib.util.find_spec(module) is None:
+            logger.warning(f"Стиснення {name} недоступне: не встановлено пакет {module}")
+        else:
+            compressors.append(name)
+    return compressors
+
+
+def _client_options() -> dict:
+    """Параметри пулу з'єднань та стиснення для AsyncIOMotorClient."""
+    options = {
+        "serverSelectionTimeoutMS": 5000,  # 5 секунд таймаут
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+        "event_listeners": [pool_stats],
+    }
+    if settings.MONGODB_COMMAND_MONITORING:
+        options["event_listeners"].append(command_stats)
+    if settings.MONGODB_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGODB_MAX_IDLE_TIME_MS
+    if settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+
+    compressors = _available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = settings.MONGODB_ZLIB_COMPRESSION_LEVEL
+    return options
+
+
+def _write_concern(w: str, journal: Optional[bool]) -> Optional[WriteConcern]:
+    """WriteConcern з налаштувань (None - за замовчуванням драйвера)."""
+    if not w and journal is None:
+        return None
+    w_value = int(w) if w.isdigit() else (w or None)
+    return WriteConcern(w=w_value, j=journal)
 
 
 class MongoDB:
@@ -20,6 +82,9 @@ class MongoDB:
     
     client: Optional[AsyncIOMotorClient] = None
     database = None
+    # Бази з налаштуваннями під навантаження (той самий клієнт і пул)
+    catalog_database = None
+    orders_database = None
     
     @classmethod
     @retry(
@@ -31,13 +96,23 @@ class MongoDB:
         """Підключення до MongoDB з retry-логікою."""
         try:
             logger.info(f"Підключення до MongoDB: {settings.MONGODB_URL}")
-            cls.client = AsyncIOMotorClient(
-                settings.MONGODB_URL,
-                serverSelectionTimeoutMS=5000,  # 5 секунд таймаут
-            )
+            cls.client = AsyncIOMotorClient(settings.MONGODB_URL, **_client_options())
             # Перевіряємо з'єднання
             await cls.client.admin.command("ping")
             cls.database = cls.client[settings.MONGODB_DB_NAME]
+            
+            # Каталог: читання можна віддати репліці; замовлення: строгіший write concern
+            cls.catalog_database = cls.client.get_database(
+                settings.MONGODB_DB_NAME,
+                read_preference=_READ_PREFERENCES[settings.MONGODB_CATALOG_READ_PREFERENCE],
+            )
+            cls.orders_database = cls.client.get_database(
+                settings.MONGODB_DB_NAME,
+                write_concern=_write_concern(
+                    settings.MONGODB_ORDERS_WRITE_CONCERN,
+                    settings.MONGODB_ORDERS_WRITE_JOURNAL,
+                ),
+            )
             logger.success(f"Успішно підключено до MongoDB: {settings.MONGODB_DB_NAME}")
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logger.error(f"Помилка підключення до MongoDB: {str(e)}")
@@ -59,6 +134,20 @@ class MongoDB:
         if cls.database is None:
             raise RuntimeError("База даних не підключена. Викличте connect() спочатку.")
         return cls.database
+    
+    @classmethod
+    def get_catalog_database(cls):
+        """База для каталогу товарів (read preference MONGODB_CATALOG_READ_PREFERENCE)."""
+        if cls.catalog_database is None:
+            return cls.get_database()
+        return cls.catalog_database
+    
+    @classmethod
+    def get_orders_database(cls):
+        """База для замовлень (write concern MONGODB_ORDERS_WRITE_CONCERN)."""
+        if cls.orders_database is None:
+            return cls.get_database()
+        return cls.orders_database
 
 
 def get_database_error_message(error_message: str) -> Optional[str]:
@@ -0,0 +1,342 @@
+"""
+Моніторинг MongoDB драйвера: статистика пулу з'єднань та команд.
+
+Слухач подій пулу реєструється при створенні клієнта і рахує створені,
+закриті, видані та очікувані з'єднання по кожному серверу.
+
+Слухач команд рахує тривалість по (метод сервісу, команда, колекція).
+Метод сервісу береться з контексту, який встановлюють методи класів,
+позначених @tag_service_methods (Motor копіює контекст у потік драйвера).
+Повільні команди логуються з формою фільтра (без значень), а в
+діагностичному режимі (MONGODB_EXPLAIN_SAMPLE_RATE > 0) частина з них
+перевіряється через explain на повний перегляд колекції (COLLSCAN).
+"""
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import monitoring
+from loguru import logger
+
+from app.core.config import settings
+from app.core.timing import add_span
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Лічильники пулу з'єднань по серверах (в межах процесу)."""
+
+    def __init__(self):
+        self._servers: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "pool_cleared": 0,
+        })
+
+    def _server(self, event) -> Dict[str, int]:
+        host, port = event.address
+        return self._servers[f"{host}:{port}"]
+
+    def pool_created(self, event):
+        self._server(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._server(event)["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._server(event)["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._server(event)["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        self._server(event)["waiting"] += 1
+
+    def connection_check_out_failed(self, event):
+        server = self._server(event)
+        server["waiting"] -= 1
+        server["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        server = self._server(event)
+        server["waiting"] -= 1
+        server["checked_out"] += 1
+        server["checkouts"] += 1
+
+    def connection_checked_in(self, event):
+        self._server(event)["checked_out"] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Знімок лічильників: open = created - closed."""
+        return {
+            address: {**counters, "open": counters["created"] - counters["closed"]}
+            for address, counters in self._servers.items()
+        }
+
+
+# Спільний слухач пулу для клієнта MongoDB
+pool_stats = PoolStatsListener()
+
+
+# Метод сервісу, що виконує поточну операцію з БД
+_service_method: ContextVar[Optional[str]] = ContextVar("service_method", default=None)
+
+# Команди, що враховуються (службові ping/hello/explain тощо - ні)
+TRACKED_COMMANDS = {
+    "find", "getMore", "aggregate", "count", "distinct",
+    "insert", "update", "delete", "findAndModify",
+}
+# Команди, для яких можна отримати план через explain
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Службові поля команди, які не передаються в explain
+_EXPLAIN_EXCLUDED_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+# Як довго не перевіряти повторно ту саму форму запиту (секунд)
+EXPLAIN_REPEAT_SECONDS = 600
+
+
+def _tagged(func, tag: str):
+    """Обгортка async методу, що встановлює назву методу в контексті."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _service_method.set(tag)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _service_method.reset(token)
+    return wrapper
+
+
+def tag_service_methods(cls):
+    """
+    Декоратор класу сервісу: публічні async методи позначають свої запити
+    до БД назвою "Клас.метод" (вкладений виклик має пріоритет).
+    """
+    for name, func in list(vars(cls).items()):
+        if isinstance(func, (staticmethod, classmethod)):
+            continue
+        if not name.startswith("_") and inspect.iscoroutinefunction(func):
+            setattr(cls, name, _tagged(func, f"{cls.__name__}.{name}"))
+    return cls
+
+
+def query_shape(value: Any) -> Any:
+    """Форма фільтра: ключі та оператори зберігаються, значення замінюються на "?"."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], dict):
+            return [query_shape(item) for item in value[:5]]
+        return "[?]"
+    return "?"
+
+
+def _command_filter(name: str, command) -> Optional[dict]:
+    """Фільтр команди (для aggregate - перший $match)."""
+    if name == "find":
+        return command.get("filter")
+    if name in ("count", "distinct", "findAndModify"):
+        return command.get("query")
+    if name == "aggregate":
+        for stage in command.get("pipeline") or []:
+            if "$match" in stage:
+                return stage["$match"]
+        return None
+    if name in ("update", "delete"):
+        operations = command.get("updates" if name == "update" else "deletes") or []
+        return operations[0].get("q") if operations else None
+    return None
+
+
+def plan_stages(explain: Any, inside_plan: bool = False) -> List[str]:
+    """Стадії виграшного плану з результату explain (включно з вкладеними)."""
+    stages: List[str] = []
+    if isinstance(explain, dict):
+        if inside_plan and isinstance(explain.get("stage"), str):
+            stages.append(explain["stage"])
+        for key, value in explain.items():
+            if key == "rejectedPlans":
+                continue
+            stages.extend(plan_stages(value, inside_plan or key in ("winningPlan", "queryPlan")))
+    elif isinstance(explain, list):
+        for item in explain:
+            stages.extend(plan_stages(item, inside_plan))
+    return stages
+
+
+class CommandStatsListener(monitoring.CommandListener):
+    """Тривалість команд по методах сервісів, повільні запити та explain (в межах процесу)."""
+
+    def __init__(self, max_slow_queries: int = 100, max_explains: int = 50):
+        self._lock = threading.Lock()
+        self._inflight: Dict[int, Tuple[str, str, str, Optional[dict], Optional[dict]]] = {}
+        self._commands: Dict[Tuple[str, str, str], Dict[str, float]] = defaultdict(lambda: {
+            "count": 0,
+            "failures": 0,
+            "slow": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        })
+        self.slow_queries: deque = deque(maxlen=max_slow_queries)
+        self.explains: deque = deque(maxlen=max_explains)
+        self._explain_queue: deque = deque(maxlen=20)
+        self._explained_at: Dict[str, float] = {}
+
+    def started(self, event):
+        name = event.command_name
+        if name not in TRACKED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        # Команда зберігається лише в діагностичному режимі (для explain)
+        explain_command = (
+            command
+            if settings.MONGODB_EXPLAIN_SAMPLE_RATE > 0 and name in EXPLAINABLE_COMMANDS
+            else None
+        )
+        self._inflight[event.request_id] = (
+            _service_method.get() or "-",
+            collection if isinstance(collection, str) else "-",
+            event.database_name,
+            _command_filter(name, command),
+            explain_command,
+        )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        info = self._inflight.pop(event.request_id, None)
+        if info is None:
+            return
+        service, collection, database_name, query, command = info
+        duration_ms = event.duration_micros / 1000
+        # Потік драйвера виконується в скопійованому контексті запиту
+        add_span("db", duration_ms / 1000)
+        slow = duration_ms >= settings.MONGODB_SLOW_QUERY_MS
+
+        with self._lock:
+            counters = self._commands[(service, event.command_name, collection)]
+            counters["count"] += 1
+            counters["total_ms"] += duration_ms
+            counters["max_ms"] = max(counters["max_ms"], duration_ms)
+            if failed:
+                counters["failures"] += 1
+            if slow:
+                counters["slow"] += 1
+
+        if slow:
+            self._record_slow(service, event.command_name, collection, database_name, query, command, duration_ms)
+
+    def _record_slow(self, service, name, collection, database_name, query, command, duration_ms):
+        """Логує повільну команду і за потреби ставить її в чергу на explain."""
+        shape = json.dumps(query_shape(query or {}), ensure_ascii=False, sort_keys=True)
+        entry = {
+            "service": service,
+            "command": name,
+            "collection": collection,
+            "filter_shape": shape,
+            "duration_ms": round(duration_ms, 2),
+            "at": datetime.utcnow(),
+        }
+        self.slow_queries.append(entry)
+        logger.warning(
+            f"Повільний запит MongoDB: {service} {name} {collection} "
+            f"{duration_ms:.0f}ms | Фільтр: {shape}"
+        )
+
+        if command is None or random.random() >= settings.MONGODB_EXPLAIN_SAMPLE_RATE:
+            return
+        key = f"{collection}:{name}:{shape}"
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(key, -EXPLAIN_REPEAT_SECONDS) < EXPLAIN_REPEAT_SECONDS:
+                return
+            self._explained_at[key] = now
+        explain_command = {
+            field: value
+            for field, value in command.items()
+            if field not in _EXPLAIN_EXCLUDED_FIELDS and not field.startswith("$")
+        }
+        self._explain_queue.append((database_name, explain_command, entry))
+
+    async def explain_sampled(self, client) -> int:
+        """
+        Виконує explain для відібраних повільних команд (фонова задача)
+        і позначає ті, що переглядають всю колекцію.
+        """
+        processed = 0
+        while self._explain_queue:
+            database_name, command, entry = self._explain_queue.popleft()
+            try:
+                result = await client[database_name].command(
+                    {"explain": command, "verbosity": "queryPlanner"}
+                )
+            except Exception as e:
+                logger.warning(f"Не вдалося виконати explain для {entry['collection']}: {str(e)}")
+                continue
+
+            stages = plan_stages(result)
+            collscan = "COLLSCAN" in stages
+            self.explains.append({**entry, "stages": stages, "collscan": collscan})
+            if collscan:
+                logger.warning(
+                    f"COLLSCAN: {entry['service']} {entry['command']} {entry['collection']} | "
+                    f"Фільтр: {entry['filter_shape']}"
+                )
+            processed += 1
+        return processed
+
+    def stats(self, limit: int = 50) -> dict:
+        """Найдорожчі команди за сумарним часом, останні повільні запити та explain."""
+        with self._lock:
+            commands = [
+                {
+                    "service": service,
+                    "command": name,
+                    "collection": collection,
+                    **counters,
+                    "total_ms": round(counters["total_ms"], 2),
+                    "max_ms": round(counters["max_ms"], 2),
+                    "avg_ms": round(counters["total_ms"] / counters["count"], 2) if counters["count"] else 0.0,
+                }
+                for (service, name, collection), counters in self._commands.items()
+            ]
+        commands.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "commands": commands[:limit],
+            "slow_queries": list(reversed(self.slow_queries))[:limit],
+            "explains": list(reversed(self.explains))[:limit],
+        }
+
+    def reset(self):
+        """Очищає накопичену статистику."""
+        with self._lock:
+            self._commands.clear()
+            self.slow_queries.clear()
+            self.explains.clear()
+            self._explained_at.clear()
+
+
+# Спільний слухач команд для клієнта MongoDB
+command_stats = CommandStatsListener()
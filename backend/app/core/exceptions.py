@@ -1,6 +1,7 @@
 """
 Кастомні винятки для PowerCore API.
 """
+import math
 from fastapi import HTTPException, status
 
 
@@ -58,6 +59,17 @@ class ConflictError(PowerCoreException):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
 
 
+class TooManyRequestsError(PowerCoreException):
+    """Перевищено ліміт запитів."""
+    
+    def __init__(self, retry_after: float, detail: str = "Забагато спроб. Спробуйте пізніше."):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
 class DatabaseError(PowerCoreException):
     """Помилка роботи з базою даних."""
     
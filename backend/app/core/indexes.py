@@ -0,0 +1,120 @@
+"""
+Індекси MongoDB, що створюються при старті додатку.
+"""
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import OperationFailure
+from loguru import logger
+
+
+# Порівняння email без урахування регістру (запити мають використовувати ту ж collation,
+# щоб MongoDB застосував індекс email_unique_ci)
+EMAIL_COLLATION = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+# Індекси по колекціях
+INDEXES = {
+    "orders": [
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "reviews": [
+        # Keyset пагінація відгуків товару для кожного варіанту сортування
+        IndexModel(
+            [("product_id", ASCENDING), ("is_approved", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="product_approved_created",
+        ),
+        IndexModel(
+            [("product_id", ASCENDING), ("is_approved", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)],
+            name="product_approved_rating",
+        ),
+        IndexModel(
+            [("product_id", ASCENDING), ("is_approved", ASCENDING), ("helpful_count", DESCENDING), ("_id", DESCENDING)],
+            name="product_approved_helpful",
+        ),
+        # Черга модерації
+        IndexModel(
+            [("is_moderated", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="moderation_queue",
+        ),
+        # Кластери майже однакових відгуків
+        IndexModel(
+            [("duplicate_cluster_id", ASCENDING), ("is_moderated", ASCENDING)],
+            name="duplicate_cluster",
+        ),
+    ],
+    "refresh_tokens": [
+        # MongoDB сам видаляє прострочені refresh токени
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+        IndexModel([("sid", ASCENDING)], name="sid"),
+        IndexModel([("user_id", ASCENDING), ("revoked", ASCENDING)], name="user_revoked"),
+    ],
+    "revoked_sessions": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "review_votes": [
+        IndexModel([("review_id", ASCENDING), ("user_id", ASCENDING)], unique=True, name="review_user_unique"),
+    ],
+}
+
+# Унікальні індекси, на які покладається логіка додатку (замість перевірок
+# перед записом). Кожен створюється окремо, а помилка зупиняє запуск:
+# без індексу обмеження мовчки не діє. Значення - як виправити дані.
+UNIQUE_INDEXES = {
+    "users": [
+        (
+            # Реєстрація покладається на DuplicateKeyError цього індексу
+            IndexModel([("email", ASCENDING)], unique=True, collation=EMAIL_COLLATION, name="email_unique_ci"),
+            "python scripts/migrate_unique_emails.py (перевірити план), потім з --apply",
+        ),
+    ],
+    "reviews": [
+        (
+            # Один відгук на користувача для товару (анонімні відгуки без user_id не обмежуються)
+            IndexModel(
+                [("product_id", ASCENDING), ("user_id", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"user_id": {"$type": "string"}},
+                name="product_user_unique",
+            ),
+            "python scripts/find_duplicate_user_reviews.py --fix",
+        ),
+    ],
+}
+
+
+class IndexBuildError(RuntimeError):
+    """Не вдалося створити обов'язковий унікальний індекс."""
+
+
+async def ensure_indexes(db):
+    """
+    Створює індекси (операція ідемпотентна).
+    Помилка звичайного індексу логується і не зупиняє запуск; унікальні
+    індекси створюються окремо, і якщо будь-який з них не вдалося
+    створити (наприклад, через дублікати в даних) - викидається IndexBuildError.
+    """
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Не вдалося створити індекси для {collection_name}: {str(e)}")
+
+    failed = []
+    for collection_name, unique_indexes in UNIQUE_INDEXES.items():
+        for index, fix_command in unique_indexes:
+            name = index.document["name"]
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                logger.critical(
+                    f"Не вдалося створити унікальний індекс {collection_name}.{name}: {str(e)}. "
+                    f"Виправте дані: {fix_command}"
+                )
+                failed.append(f"{collection_name}.{name}")
+
+    if failed:
+        raise IndexBuildError(f"Не створено унікальні індекси: {', '.join(failed)}")
+    logger.info("Індекси MongoDB перевірено")
@@ -1,44 +1,216 @@
 """
 Налаштування Loguru для професійного логування.
+
+Логи форматуються в потоці, що логує, і кладуться в обмежену чергу;
+окремий потік записує їх у консоль та файл. Якщо черга заповнена,
+повідомлення відкидається (і рахується), а запит не чекає на диск.
+INFO/DEBUG логи запитів семплюються по маршрутах (LOG_SAMPLE_RATES).
 """
+import copy
+import json
+import os
+import queue
+import random
 import sys
+import threading
+import traceback
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
 from loguru import logger
 from app.core.config import settings
 
 
-def setup_logging():
+TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+# Чи логувати INFO/DEBUG для поточного запиту (рішення семплювання)
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+
+def _json_format(record) -> str:
+    """Компактний JSON рядок на запис (extra поля потрапляють у JSON)."""
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    payload.update({k: v for k, v in record["extra"].items() if not k.startswith("_")})
+    if record["exception"] is not None:
+        exc_type, exc_value, exc_traceback = record["exception"]
+        payload["exception"] = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+    record["extra"]["_json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+def _sampling_filter(record) -> bool:
+    """WARNING і вище проходять завжди, INFO/DEBUG - лише для семплованих запитів."""
+    return record["level"].no >= 30 or _request_sampled.get()
+
+
+def sample_request(path: str) -> bool:
+    """
+    Вирішує, чи логувати INFO/DEBUG для запиту (за найдовшим префіксом
+    шляху в LOG_SAMPLE_RATES), і запам'ятовує рішення в контексті запиту.
+    """
+    rate = settings.LOG_REQUEST_SAMPLE_RATE
+    matched = -1
+    for prefix, prefix_rate in settings.LOG_SAMPLE_RATES.items():
+        if path.startswith(prefix) and len(prefix) > matched:
+            rate, matched = prefix_rate, len(prefix)
+    sampled = rate >= 1.0 or random.random() < rate
+    _request_sampled.set(sampled)
+    return sampled
+
+
+class BoundedQueueSink:
+    """
+    Sink з обмеженою чергою та потоком-записувачем.
+    Отримує вже відформатовані повідомлення і передає їх окремому
+    (незалежному) логеру з реальними sink-ами.
+    """
+
+    def __init__(self, writer, maxsize: int):
+        self._writer = writer
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        try:
+            self._queue.put_nowait(str(message))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            try:
+                self._writer.opt(raw=True).info(message)
+            except Exception:
+                # Записувач не повинен падати через помилку одного sink
+                pass
+
+    def stop(self, timeout: float = 5.0):
+        """Дописує чергу та зупиняє потік."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=timeout)
+        self._writer.remove()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "maxsize": self._queue.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+# Поточний sink з чергою (None - синхронне логування)
+_queue_sink: Optional[BoundedQueueSink] = None
+
+# Чи пише процес у власний файл логів (воркер gunicorn)
+_per_process = False
+
+
+def _log_file(per_process: bool) -> str:
+    """
+    Шлях файлу логів. У воркерах gunicorn кожен процес пише у власний файл
+    (powercore.<pid>.log): кілька процесів, що ротують один файл, губили б рядки.
+    """
+    if not per_process:
+        return settings.LOG_FILE
+    path = Path(settings.LOG_FILE)
+    return str(path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}"))
+
+
+def setup_logging(per_process: Optional[bool] = None):
     """
     Налаштовує Loguru для логування у файл та консоль.
+    per_process=True - файл з pid процесу (для воркерів gunicorn); None -
+    як при попередньому виклику (без preload додаток імпортується у воркері
+    вже після post_fork і повторно налаштовує логування).
     """
-    # Видаляємо стандартний handler
+    global _queue_sink, _per_process
+
+    if per_process is None:
+        per_process = _per_process
+    _per_process = per_process
+
+    # Видаляємо стандартний handler (і попередню конфігурацію)
     logger.remove()
-    
+    if _queue_sink is not None:
+        _queue_sink.stop()
+        _queue_sink = None
+
     # Створюємо директорію для логів
-    log_path = Path(settings.LOG_FILE)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Додаємо консольний handler з кольоровим виводом
-    logger.add(
-        sys.stdout,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level=settings.LOG_LEVEL,
-        colorize=True,
-    )
-    
-    # Додаємо файловий handler з ротацією
-    logger.add(
-        settings.LOG_FILE,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level=settings.LOG_LEVEL,
-        rotation="10 MB",  # Ротація при досягненні 10MB
-        retention="30 days",  # Зберігати логи 30 днів
-        compression="zip",  # Стискати старі логи
-        backtrace=True,  # Показувати повний traceback
-        diagnose=True,  # Детальна діагностика
-    )
-    
+    log_file = _log_file(per_process)
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+
+    use_json = settings.LOG_FORMAT == "json"
+    file_options = {
+        "rotation": "10 MB",  # Ротація при досягненні 10MB
+        "retention": "30 days",  # Зберігати логи 30 днів
+        "compression": "zip",  # Стискати старі логи
+    }
+
+    if settings.LOG_QUEUE_SIZE > 0:
+        # Незалежний логер лише для запису вже відформатованих рядків
+        writer = copy.deepcopy(logger)
+        writer.add(sys.stdout, format="{message}", level=0, colorize=False)
+        writer.add(log_file, format="{message}", level=0, **file_options)
+
+        _queue_sink = BoundedQueueSink(writer, settings.LOG_QUEUE_SIZE)
+        logger.add(
+            _queue_sink.write,
+            format=_json_format if use_json else TEXT_FORMAT,
+            level=settings.LOG_LEVEL,
+            filter=_sampling_filter,
+            backtrace=settings.LOG_BACKTRACE,
+            diagnose=settings.LOG_DIAGNOSE,
+            colorize=False,
+        )
+    else:
+        # Синхронне логування (зручно для локальної розробки)
+        logger.add(
+            sys.stdout,
+            format=_json_format if use_json else CONSOLE_FORMAT,
+            level=settings.LOG_LEVEL,
+            filter=_sampling_filter,
+            colorize=not use_json,
+            backtrace=settings.LOG_BACKTRACE,
+            diagnose=settings.LOG_DIAGNOSE,
+        )
+        logger.add(
+            log_file,
+            format=_json_format if use_json else TEXT_FORMAT,
+            level=settings.LOG_LEVEL,
+            filter=_sampling_filter,
+            backtrace=settings.LOG_BACKTRACE,
+            diagnose=settings.LOG_DIAGNOSE,
+            **file_options,
+        )
+
     logger.info("Logging налаштовано успішно")
     return logger
 
 
+def shutdown_logging():
+    """Дописує чергу логів (при зупинці додатку)."""
+    if _queue_sink is not None:
+        _queue_sink.stop()
+
+
+def logging_stats() -> dict:
+    """Статистика черги логів."""
+    if _queue_sink is None:
+        return {"mode": "sync"}
+    return {"mode": "queue", **_queue_sink.stats()}
@@ -0,0 +1,159 @@
+"""
+Метрики у форматі Prometheus (GET /metrics).
+
+- Запити: гістограма тривалості та лічильник за методом, шаблоном маршруту
+  (/api/v1/products/{product_id}, а не сирим шляхом) та статусом.
+- Запити в обробці, затримка event loop.
+- Пул з'єднань MongoDB та кеші процесу: знімаються періодично в кожному
+  воркері (лічильники кешів переносяться як приріст).
+
+Якщо задано METRICS_MULTIPROC_DIR, prometheus_client працює в multiprocess
+режимі: кожен воркер пише значення у файли каталогу, а /metrics будь-якого
+воркера агрегує їх для всіх процесів.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+# Multiprocess режим вмикається змінною оточення до імпорту prometheus_client
+if settings.METRICS_MULTIPROC_DIR:
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.METRICS_MULTIPROC_DIR)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.db_monitoring import pool_stats  # noqa: E402
+
+
+# Маршрут для запитів, що не збіглися з жодним роутом (404 тощо)
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Тривалість обробки HTTP запиту",
+    ["method", "route", "status"],
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests",
+    "Кількість HTTP запитів",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP запити в обробці",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Затримка event loop (наскільки пізніше запланованого прокидається задача)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections",
+    "З'єднання пулу MongoDB за станом (open, checked_out, waiting)",
+    ["server", "state"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUTS = Counter(
+    "mongodb_pool_checkouts",
+    "Видачі з'єднань з пулу MongoDB",
+    ["server"],
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures",
+    "Невдалі видачі з'єднань з пулу MongoDB",
+    ["server"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Звернення до кешів процесу (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+
+# Останні перенесені значення лічильників (для обчислення приросту)
+_last_counts: Dict[Tuple[int, Tuple[str, ...]], float] = {}
+
+
+def _advance(counter: Counter, labels: Tuple[str, ...], current: float):
+    """Збільшує лічильник на приріст з минулого зняття (скидання = новий відлік)."""
+    key = (id(counter), labels)
+    previous = _last_counts.get(key, 0.0)
+    delta = current - previous if current >= previous else current
+    if delta > 0:
+        counter.labels(*labels).inc(delta)
+    _last_counts[key] = current
+
+
+def _cache_stats() -> Dict[str, dict]:
+    """Статистика кешів процесу за назвою."""
+    from app.services.auth_service import user_auth_cache
+    from app.services.review_service import pending_count_cache
+    from app.services.stats_service import admin_stats_cache
+    from app.utils.security import token_cache_stats
+
+    return {
+        admin_stats_cache.name: admin_stats_cache.stats(),
+        pending_count_cache.name: pending_count_cache.stats(),
+        user_auth_cache.name: user_auth_cache.stats(),
+        "decoded_tokens": token_cache_stats(),
+    }
+
+
+def refresh_process_metrics():
+    """Знімає стан пулу та кешів поточного процесу в метрики."""
+    for server, counters in pool_stats.stats().items():
+        for state in ("open", "checked_out", "waiting"):
+            POOL_CONNECTIONS.labels(server, state).set(counters[state])
+        _advance(POOL_CHECKOUTS, (server,), counters["checkouts"])
+        _advance(POOL_CHECKOUT_FAILURES, (server,), counters["checkout_failures"])
+
+    for name, stats in _cache_stats().items():
+        _advance(CACHE_REQUESTS, (name, "hit"), stats.get("hits", 0) + stats.get("stale_hits", 0))
+        _advance(CACHE_REQUESTS, (name, "miss"), stats.get("misses", 0))
+
+
+async def refresh_metrics_task():
+    """Періодична задача: знімок стану процесу."""
+    refresh_process_metrics()
+
+
+async def measure_loop_lag(probe_seconds: float = 0.01):
+    """Вимірює, наскільки пізніше запланованого прокидається короткий sleep."""
+    started = time.perf_counter()
+    await asyncio.sleep(probe_seconds)
+    EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - probe_seconds))
+
+
+def route_label(request) -> str:
+    """Шаблон маршруту запиту (обмежена кількість значень мітки)."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def render_metrics() -> bytes:
+    """Метрики у текстовому форматі (в multiprocess режимі - всіх воркерів)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int):
+    """Прибирає live-значення завершеного воркера (викликається з gunicorn)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
@@ -1,6 +1,7 @@
 """
 Middleware для обробки помилок та логування запитів.
 """
+import random
 import time
 from typing import Callable
 from fastapi import Request, Response, status
@@ -8,6 +9,20 @@ from fastapi.responses import JSONResponse
 from loguru import logger
 from app.core.exceptions import PowerCoreException
 from app.core.database import get_database_error_message
+from app.core.config import settings
+from app.core.logging import sample_request
+from app.core.metrics import (
+    REQUEST_DURATION,
+    REQUESTS_IN_PROGRESS,
+    REQUESTS_TOTAL,
+    route_label,
+)
+from app.core.timing import (
+    current_timing,
+    reset_request_timing,
+    server_timing_header,
+    start_request_timing,
+)
 
 
 async def error_handler_middleware(request: Request, call_next: Callable) -> Response:
@@ -30,6 +45,7 @@ async def error_handler_middleware(request: Request, call_next: Callable) -> Res
                     "type": e.__class__.__name__,
                 },
             },
+            headers=e.headers,
         )
     except Exception as e:
         # Всі інші помилки - логуємо детально, клієнту показуємо загальне повідомлення
@@ -59,21 +75,23 @@ async def error_handler_middleware(request: Request, call_next: Callable) -> Res
 
 async def logging_middleware(request: Request, call_next: Callable) -> Response:
     """
-    Middleware для логування всіх запитів.
+    Middleware для логування запитів: один рядок на запит.
+    INFO логи запиту семплюються по маршрутах (LOG_SAMPLE_RATES).
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    sample_request(request.url.path)
     
-    # Логуємо вхідний запит
-    logger.info(
+    # Вхідний запит - лише на рівні DEBUG
+    logger.debug(
         f"→ {request.method} {request.url.path} | "
         f"Client: {request.client.host if request.client else 'Unknown'}"
     )
     
     try:
         response = await call_next(request)
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         
-        # Логуємо успішну відповідь
+        # Логуємо відповідь
         logger.info(
             f"← {request.method} {request.url.path} | "
             f"Status: {response.status_code} | "
@@ -82,7 +100,7 @@ async def logging_middleware(request: Request, call_next: Callable) -> Response:
         
         return response
     except Exception as e:
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         logger.error(
             f"✗ {request.method} {request.url.path} | "
             f"Error: {str(e)} | "
@@ -91,3 +109,64 @@ async def logging_middleware(request: Request, call_next: Callable) -> Response:
         raise
 
 
+async def metrics_middleware(request: Request, call_next: Callable) -> Response:
+    """
+    Middleware для метрик запитів: тривалість, кількість та запити в обробці.
+    Маршрут береться як шаблон роуту, тому кількість міток обмежена.
+    """
+    start_time = time.perf_counter()
+    in_progress = REQUESTS_IN_PROGRESS.labels(request.method)
+    in_progress.inc()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        labels = (request.method, route_label(request), str(status_code))
+        REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - start_time)
+        REQUESTS_TOTAL.labels(*labels).inc()
+
+
+async def server_timing_middleware(request: Request, call_next: Callable) -> Response:
+    """
+    Middleware для розбивки часу запиту: заголовок Server-Timing та
+    (семпльований) структурований лог повільних запитів.
+    """
+    start_time = time.perf_counter()
+    token = start_request_timing()
+    try:
+        response = await call_next(request)
+        timing = current_timing()
+    finally:
+        reset_request_timing(token)
+
+    total = time.perf_counter() - start_time
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = server_timing_header(timing, total)
+        # Браузер показує Server-Timing іншого origin лише з Timing-Allow-Origin
+        origin = request.headers.get("origin")
+        if origin and origin in settings.CORS_ORIGINS:
+            response.headers["Timing-Allow-Origin"] = origin
+
+    total_ms = total * 1000
+    if (
+        settings.SLOW_REQUEST_MS > 0
+        and total_ms >= settings.SLOW_REQUEST_MS
+        and random.random() < settings.SLOW_REQUEST_LOG_SAMPLE_RATE
+    ):
+        spans = timing.summary()
+        logger.bind(
+            method=request.method,
+            route=route_label(request),
+            status=response.status_code,
+            total_ms=round(total_ms, 2),
+            spans=spans,
+        ).warning(
+            f"Повільний запит: {request.method} {request.url.path} | "
+            f"Time: {total_ms:.0f}ms | "
+            + ", ".join(f"{name}={span['ms']:.0f}ms" for name, span in spans.items())
+        )
+
+    return response
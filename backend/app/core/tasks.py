@@ -0,0 +1,132 @@
+"""
+Фонові періодичні задачі, що працюють у межах процесу API.
+
+Кожен воркер gunicorn запускає однаковий набір задач. Задачі, які мають
+виконуватись лише в одному процесі (звірки, перерахунки), запускаються з
+single_runner=True: перед кожним запуском процес бере оренду (lease) у
+колекції task_leases і пропускає запуск, якщо її тримає інший процес.
+"""
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Set
+from loguru import logger
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database import MongoDB
+
+
+def lease_owner() -> str:
+    """Ідентифікатор поточного процесу (після fork у кожного воркера свій)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def acquire_lease(name: str, ttl_seconds: float) -> bool:
+    """
+    Бере або продовжує оренду name на ttl_seconds.
+    Повертає False, якщо діючу оренду тримає інший процес.
+    """
+    owner = lease_owner()
+    now = datetime.utcnow()
+    try:
+        lease = await MongoDB.get_database().task_leases.find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Документ існує і оренда діюча - upsert не може вставити другий
+        return False
+    return lease is not None and lease.get("owner") == owner
+
+
+async def release_lease(name: str):
+    """Звільняє оренду name, якщо її тримає поточний процес."""
+    await MongoDB.get_database().task_leases.delete_one({"_id": name, "owner": lease_owner()})
+
+
+class PeriodicTasks:
+    """Реєстр періодичних задач, що запускаються в lifespan додатку."""
+
+    tasks: List[asyncio.Task] = []
+    # Назви задач з орендою (звільняються при зупинці)
+    leases: Set[str] = set()
+
+    @classmethod
+    def start(
+        cls,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval_seconds: float,
+        run_immediately: bool = False,
+        single_runner: bool = False,
+    ) -> asyncio.Task:
+        """
+        Запускає func кожні interval_seconds секунд.
+        Помилки логуються і не зупиняють задачу.
+
+        single_runner=True - func виконується лише в процесі, що тримає
+        оренду задачі (термін - два інтервали, власник продовжує її при
+        кожному запуску; після падіння власника оренду перехопить інший).
+        """
+        lease_name = f"task:{name}"
+
+        async def runner():
+            if not run_immediately:
+                await asyncio.sleep(interval_seconds)
+            while True:
+                try:
+                    if single_runner and not await acquire_lease(lease_name, interval_seconds * 2):
+                        logger.debug(f"Фонову задачу {name} виконує інший процес")
+                    else:
+                        await func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Помилка у фоновій задачі {name}: {str(e)}")
+                await asyncio.sleep(interval_seconds)
+
+        task = asyncio.create_task(runner(), name=name)
+        cls.tasks.append(task)
+        if single_runner:
+            cls.leases.add(lease_name)
+        logger.info(f"Запущено фонову задачу {name} (інтервал {interval_seconds}s)")
+        return task
+
+    @classmethod
+    def run_once(cls, name: str, func: Callable[[], Awaitable]) -> asyncio.Task:
+        """
+        Запускає func один раз у фоні (зупиняється разом з іншими задачами).
+        Помилки логуються.
+        """
+        async def runner():
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка у фоновій задачі {name}: {str(e)}")
+
+        task = asyncio.create_task(runner(), name=name)
+        cls.tasks.append(task)
+        logger.info(f"Запущено фонову задачу {name}")
+        return task
+
+    @classmethod
+    async def stop_all(cls):
+        """Зупиняє всі фонові задачі."""
+        for task in cls.tasks:
+            task.cancel()
+        await asyncio.gather(*cls.tasks, return_exceptions=True)
+        cls.tasks = []
+
+        # Інший процес може перехопити задачі одразу, не чекаючи терміну оренди
+        for lease_name in cls.leases:
+            try:
+                await release_lease(lease_name)
+            except Exception as e:
+                logger.warning(f"Не вдалося звільнити оренду {lease_name}: {str(e)}")
+        cls.leases = set()
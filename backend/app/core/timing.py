@@ -0,0 +1,150 @@
+"""
+Розбивка часу запиту на проміжки (Server-Timing).
+
+Для кожного запиту middleware створює RequestTiming у contextvar; код
+додає до нього час за назвою проміжку:
+- db - тривалість команд MongoDB (зі слухача команд драйвера);
+- serialize - серіалізація документів (@timed("serialize"));
+- handler - функція endpoint, validate - решта роботи FastAPI
+  (валідація запиту, залежності, серіалізація відповіді) - через TimedRoute.
+
+Проміжки можуть перекриватися (db входить у handler), тому не сумуються.
+"""
+import asyncio
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+
+class RequestTiming:
+    """Сумарний час і кількість викликів по проміжках одного запиту."""
+
+    __slots__ = ("spans", "active", "_lock")
+
+    def __init__(self):
+        self.spans: Dict[str, List[float]] = {}
+        # Проміжки, що вимірюються зараз (вкладені виклики не рахуються двічі)
+        self.active = set()
+        # Команди БД завершуються в потоках драйвера
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def total(self, name: str) -> float:
+        entry = self.spans.get(name)
+        return entry[0] if entry else 0.0
+
+    def summary(self) -> Dict[str, dict]:
+        """Проміжки в мілісекундах (для логів)."""
+        return {
+            name: {"ms": round(seconds * 1000, 2), "count": int(count)}
+            for name, (seconds, count) in self.spans.items()
+        }
+
+
+_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def start_request_timing():
+    """Створює розбивку часу для поточного запиту. Повертає token для reset."""
+    return _timing.set(RequestTiming())
+
+
+def reset_request_timing(token):
+    _timing.reset(token)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _timing.get()
+
+
+def add_span(name: str, seconds: float):
+    """Додає час до проміжку поточного запиту (поза запитом - нічого)."""
+    timing = _timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+def timed(name: str):
+    """
+    Декоратор синхронної функції: її час додається до проміжку name.
+    Рекурсивні та вкладені виклики враховуються лише на зовнішньому рівні.
+    """
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timing = _timing.get()
+            if timing is None or name in timing.active:
+                return func(*args, **kwargs)
+            timing.active.add(name)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.active.discard(name)
+                timing.add(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(timing: RequestTiming, total_seconds: float) -> str:
+    """Значення заголовка Server-Timing (тривалості в мілісекундах)."""
+    parts = [
+        f"{name};dur={seconds * 1000:.2f}"
+        for name, (seconds, _count) in timing.spans.items()
+    ]
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Обгортка async endpoint, що вимірює проміжок handler."""
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            add_span("handler", time.perf_counter() - started)
+    wrapper.timed_endpoint = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Роут з розбивкою часу: handler - функція endpoint, validate - решта
+    обробки FastAPI (валідація, залежності, серіалізація відповіді).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # Синхронні endpoint виконуються в пулі потоків - їх не обгортаємо;
+        # include_router створює роут повторно з уже обгорнутим endpoint
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "timed_endpoint", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timing = _timing.get()
+            if timing is None:
+                return await handler(request)
+            started = time.perf_counter()
+            handler_before = timing.total("handler")
+            try:
+                return await handler(request)
+            finally:
+                elapsed = time.perf_counter() - started
+                timing.add("validate", max(0.0, elapsed - (timing.total("handler") - handler_before)))
+
+        return timed_handler
+
@@ -0,0 +1,32 @@
+"""
+Стан процесу, який потрібно перестворити у кожному воркері після fork.
+
+При preload додаток імпортується в master процесі, тому кеші, пули потоків
+та логер успадковуються воркерами. Клієнт MongoDB, індекс дублікатів та
+фонові задачі створюються в lifespan, тобто вже у воркері.
+"""
+from loguru import logger
+
+from app.core.logging import setup_logging
+
+
+def reset_after_fork():
+    """Скидає кеші процесу та перестворює потоки (викликається з post_fork)."""
+    from app.services.stats_service import admin_stats_cache
+    from app.services.review_service import duplicate_index, duplicate_index_state, pending_count_cache
+    from app.services.auth_service import user_auth_cache
+    from app.utils.security import invalidate_token_cache, reset_password_executor
+
+    # Потоки логера та bcrypt не переживають fork; файл логів - окремий
+    # для кожного воркера, щоб процеси не ротували один файл
+    setup_logging(per_process=True)
+    reset_password_executor()
+
+    admin_stats_cache.invalidate()
+    pending_count_cache.invalidate()
+    user_auth_cache.invalidate()
+    invalidate_token_cache()
+    duplicate_index.clear()
+    duplicate_index_state["ready"] = False
+
+    logger.info("Стан воркера ініціалізовано після fork")
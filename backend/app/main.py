@@ -2,14 +2,35 @@
 Головний файл FastAPI додатку PowerCore.
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from loguru import logger
 
 from app.core.config import settings
 from app.core.database import MongoDB
-from app.core.logging import setup_logging
-from app.core.middleware import error_handler_middleware, logging_middleware
+from app.core.db_monitoring import command_stats
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.middleware import (
+    error_handler_middleware,
+    logging_middleware,
+    metrics_middleware,
+    server_timing_middleware,
+)
+from app.core.metrics import (
+    CONTENT_TYPE_LATEST,
+    measure_loop_lag,
+    refresh_metrics_task,
+    refresh_process_metrics,
+    render_metrics,
+)
+from app.core.indexes import ensure_indexes
+from app.core.tasks import PeriodicTasks
+from app.utils.security import shutdown_password_executor
+from app.services.stats_service import get_stats_service
+from app.services.analytics_service import get_analytics_service
+from app.services.review_service import get_review_service
+from app.services.token_service import get_token_service
 
 
 # Налаштовуємо логування
@@ -25,6 +46,38 @@ async def lifespan(app: FastAPI):
     logger.info("Запуск PowerCore API...")
     try:
         await MongoDB.connect()
+        await ensure_indexes(MongoDB.get_database())
+        # Індекс дублікатів будується у фоні - додаток готовий одразу
+        PeriodicTasks.run_once("duplicate-index-load", lambda: get_review_service().load_duplicate_index())
+        PeriodicTasks.start(
+            "stats-reconcile",
+            lambda: get_stats_service().reconcile_counters(),
+            settings.STATS_RECONCILE_INTERVAL_SECONDS,
+            run_immediately=True,
+            single_runner=True,
+        )
+        PeriodicTasks.start(
+            "token-revocation-sync",
+            lambda: get_token_service().sync_revocations(),
+            settings.TOKEN_REVOCATION_SYNC_SECONDS,
+            run_immediately=True,
+        )
+        PeriodicTasks.start(
+            "analytics-rollup",
+            lambda: get_analytics_service().refresh_rollups(),
+            settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+            run_immediately=True,
+            single_runner=True,
+        )
+        if settings.MONGODB_COMMAND_MONITORING and settings.MONGODB_EXPLAIN_SAMPLE_RATE > 0:
+            PeriodicTasks.start(
+                "query-explain",
+                lambda: command_stats.explain_sampled(MongoDB.client),
+                settings.MONGODB_EXPLAIN_INTERVAL_SECONDS,
+            )
+        if settings.METRICS_ENABLED:
+            PeriodicTasks.start("metrics-refresh", refresh_metrics_task, settings.METRICS_REFRESH_SECONDS)
+            PeriodicTasks.start("event-loop-lag", measure_loop_lag, settings.METRICS_LOOP_LAG_INTERVAL_SECONDS)
         logger.success("PowerCore API готовий до роботи")
     except Exception as e:
         logger.error(f"Помилка під час запуску: {str(e)}")
@@ -34,8 +87,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Зупинка PowerCore API...")
+    await PeriodicTasks.stop_all()
+    shutdown_password_executor()
     await MongoDB.disconnect()
     logger.info("PowerCore API зупинено")
+    shutdown_logging()
 
 
 # Створюємо FastAPI додаток
@@ -60,6 +116,12 @@ app.add_middleware(
 # Додаємо custom middleware (важливо: порядок має значення)
 app.middleware("http")(logging_middleware)
 app.middleware("http")(error_handler_middleware)
+if settings.METRICS_ENABLED:
+    # Зовнішній шар: бачить і відповіді, сформовані обробником помилок
+    app.middleware("http")(metrics_middleware)
+if settings.SERVER_TIMING_ENABLED or settings.SLOW_REQUEST_MS > 0:
+    # Найзовнішніший шар: total включає всі middleware
+    app.middleware("http")(server_timing_middleware)
 
 
 @app.get("/")
@@ -91,6 +153,16 @@ async def health_check():
         }
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Метрики у форматі Prometheus (в multiprocess режимі - всіх воркерів)."""
+        refresh_process_metrics()
+        # Читання файлів метрик воркерів - поза event loop
+        content = await run_in_threadpool(render_metrics)
+        return Response(content=content, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 # Підключаємо роути для API v1
 from app.api.v1 import auth, products, search, orders, admin, reviews, calculator
 
@@ -1,6 +1,7 @@
 """
 Pydantic моделі для автентифікації.
 """
+from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -33,5 +34,7 @@ class TokenData(BaseModel):
     user_id: str
     email: str
     is_admin: bool
+    sid: Optional[str] = None  # ID сесії (сімейства refresh токенів)
+    jti: Optional[str] = None  # ID конкретного refresh токена
 
 
@@ -39,6 +39,14 @@ class PaginatedResponse(BaseModel):
         )
 
 
+class CursorPage(BaseModel):
+    """Сторінка з keyset (cursor) пагінацією."""
+    
+    items: List[Any] = Field(default_factory=list, description="Список елементів")
+    next_cursor: Optional[str] = Field(None, description="Курсор наступної сторінки (None - кінець)")
+    limit: int
+
+
 class ProductFilters(BaseModel):
     """Фільтри для товарів."""
     
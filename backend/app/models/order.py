@@ -2,12 +2,35 @@
 Pydantic моделі для замовлень (Order).
 """
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field, EmailStr
+from typing import Annotated, List, Optional
+from pydantic import AfterValidator, BaseModel, Field, EmailStr, model_validator
 from bson import ObjectId
 from app.models.product import PyObjectId
 
 
+# Дозволені статуси замовлення та оплати
+ORDER_STATUSES = ["new", "processing", "shipped", "delivered", "cancelled"]
+PAYMENT_STATUSES = ["pending", "paid", "failed", "refunded"]
+
+
+def _check_order_status(value: Optional[str]) -> Optional[str]:
+    """Перевіряє, що статус замовлення входить до дозволених."""
+    if value is not None and value not in ORDER_STATUSES:
+        raise ValueError(f"Невірний статус. Дозволені: {', '.join(ORDER_STATUSES)}")
+    return value
+
+
+def _check_payment_status(value: Optional[str]) -> Optional[str]:
+    """Перевіряє, що статус оплати входить до дозволених."""
+    if value is not None and value not in PAYMENT_STATUSES:
+        raise ValueError(f"Невірний статус оплати. Дозволені: {', '.join(PAYMENT_STATUSES)}")
+    return value
+
+
+OrderStatusValue = Annotated[Optional[str], AfterValidator(_check_order_status)]
+PaymentStatusValue = Annotated[Optional[str], AfterValidator(_check_payment_status)]
+
+
 class OrderItem(BaseModel):
     """Елемент замовлення."""
     
@@ -72,3 +95,65 @@ class OrderResponse(Order):
     class Config:
         from_attributes = True
 
+
+
+class OrderStatusChange(BaseModel):
+    """Зміна статусів одного замовлення в масовій операції."""
+    
+    order_id: str = Field(..., description="ID замовлення")
+    order_status: OrderStatusValue = Field(None, description="Новий статус замовлення")
+    payment_status: PaymentStatusValue = Field(None, description="Новий статус оплати")
+
+
+class BulkOrderFilter(BaseModel):
+    """Фільтр для вибору замовлень у масовій операції."""
+    
+    order_status: OrderStatusValue = Field(None, description="Поточний статус замовлення")
+    payment_status: PaymentStatusValue = Field(None, description="Поточний статус оплати")
+    created_from: Optional[datetime] = Field(None, description="Створені не раніше")
+    created_to: Optional[datetime] = Field(None, description="Створені не пізніше")
+    
+    def to_mongo_query(self) -> dict:
+        """Перетворює фільтр в MongoDB query."""
+        query = {}
+        if self.order_status:
+            query["order_status"] = self.order_status
+        if self.payment_status:
+            query["payment_status"] = self.payment_status
+        if self.created_from or self.created_to:
+            query["created_at"] = {}
+            if self.created_from:
+                query["created_at"]["$gte"] = self.created_from
+            if self.created_to:
+                query["created_at"]["$lte"] = self.created_to
+        return query
+
+
+class BulkOrderStatusUpdate(BaseModel):
+    """
+    Запит на масову зміну статусів замовлень.
+    Вказується рівно одне з: order_ids, filter (однакові статуси для всіх)
+    або updates (окремі статуси для кожного замовлення).
+    """
+    
+    order_ids: Optional[List[str]] = Field(None, max_length=500, description="ID замовлень")
+    filter: Optional[BulkOrderFilter] = Field(None, description="Фільтр замовлень")
+    updates: Optional[List[OrderStatusChange]] = Field(None, max_length=500, description="Окремі зміни")
+    order_status: OrderStatusValue = Field(None, description="Новий статус замовлення")
+    payment_status: PaymentStatusValue = Field(None, description="Новий статус оплати")
+    
+    @model_validator(mode="after")
+    def check_target(self):
+        """Перевіряє, що вибрано рівно один спосіб вказати замовлення."""
+        targets = [t for t in (self.order_ids, self.filter, self.updates) if t is not None]
+        if len(targets) != 1:
+            raise ValueError("Вкажіть рівно одне з полів: order_ids, filter або updates")
+        if self.filter is not None and not self.filter.to_mongo_query():
+            raise ValueError("Фільтр не може бути порожнім: вкажіть хоча б одну умову")
+        if self.updates is None and not (self.order_status or self.payment_status):
+            raise ValueError("Вкажіть order_status та/або payment_status")
+        if self.updates is not None and any(
+            not (u.order_status or u.payment_status) for u in self.updates
+        ):
+            raise ValueError("Кожна зміна має містити order_status та/або payment_status")
+        return self
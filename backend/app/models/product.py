@@ -2,7 +2,7 @@
 Pydantic моделі для товарів (Product).
 """
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from bson import ObjectId
 
@@ -71,10 +71,33 @@ class ProductUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+class ReviewSummaryItem(BaseModel):
+    """Короткий відгук, вбудований у товар."""
+    
+    id: str
+    user_name: Optional[str] = None
+    rating: float
+    comment: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class ReviewSummary(BaseModel):
+    """Підсумок схвалених відгуків товару (підтримується ReviewService)."""
+    
+    count: int = Field(default=0, ge=0, description="Кількість схвалених відгуків")
+    average: float = Field(default=0.0, ge=0.0, le=5.0, description="Середня оцінка відгуків")
+    latest: List[ReviewSummaryItem] = Field(default_factory=list, description="Останні схвалені відгуки")
+
+
 class Product(ProductBase):
     """Модель товару з ID та датами."""
     
     id: PyObjectId = Field(default_factory=lambda: ObjectId(), alias="_id")
+    rating_histogram: Dict[str, int] = Field(
+        default_factory=lambda: {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
+        description="Розподіл оцінок за зірками (1-5)",
+    )
+    review_summary: ReviewSummary = Field(default_factory=ReviewSummary, description="Підсумок відгуків")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
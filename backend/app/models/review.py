@@ -2,7 +2,7 @@
 Pydantic моделі для відгуків (Reviews).
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from bson import ObjectId as BsonObjectId
 
@@ -56,6 +56,9 @@ class Review(ReviewBase):
     is_approved: bool = Field(default=False, description="Чи схвалено модератором")
     is_moderated: bool = Field(default=False, description="Чи перевірено модератором")
     moderator_comment: Optional[str] = Field(None, max_length=500, description="Коментар модератора")
+    helpful_count: int = Field(default=0, ge=0, description="Кількість позначок \"корисний\"")
+    duplicate_cluster_id: Optional[str] = Field(None, description="ID кластера майже однакових відгуків")
+    duplicate_score: float = Field(default=0.0, ge=0.0, le=1.0, description="Схожість з кластером (0-1)")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -75,9 +78,33 @@ class ReviewResponse(BaseModel):
     rating: float
     comment: str
     is_approved: bool
+    helpful_count: int = 0
+    duplicate_cluster_id: Optional[str] = None
+    duplicate_score: float = 0.0
     created_at: str
     updated_at: str
     
     class Config:
         from_attributes = True
 
+
+
+class ReviewModerationDecision(BaseModel):
+    """Рішення модератора щодо одного відгуку."""
+    
+    review_id: str = Field(..., description="ID відгуку")
+    is_approved: bool = Field(..., description="Схвалити відгук")
+    moderator_comment: Optional[str] = Field(None, max_length=500, description="Коментар модератора")
+
+
+class BulkReviewModeration(BaseModel):
+    """Запит на масову модерацію відгуків."""
+    
+    decisions: List[ReviewModerationDecision] = Field(..., min_length=1, max_length=500)
+
+
+class ClusterModeration(BaseModel):
+    """Рішення модератора для всього кластера майже однакових відгуків."""
+    
+    is_approved: bool = Field(..., description="Схвалити відгуки кластера")
+    moderator_comment: Optional[str] = Field(None, max_length=500, description="Коментар модератора")
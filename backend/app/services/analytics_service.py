@@ -0,0 +1,183 @@
+"""
+Сервіс для аналітики виручки та замовлень по періодах.
+
+Денні підсумки (rollups) зберігаються в колекції order_rollups_daily.
+Фонова задача оновлює лише дні, в яких змінювались замовлення після
+останньої позначки (watermark), і записує їх через $merge. Задача
+виконується в одному процесі (оренда PeriodicTasks, single_runner).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from loguru import logger
+
+from app.core.database import MongoDB
+from app.core.exceptions import DatabaseError, ValidationError
+from app.core.db_monitoring import tag_service_methods
+
+
+# ID документа з позначкою останнього оновлення у колекції stats
+ROLLUP_WATERMARK_ID = "order_rollups_daily"
+
+# Діапазон за замовчуванням для кожної гранулярності
+DEFAULT_RANGES = {
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=26),
+    "month": timedelta(days=365),
+}
+
+
+@tag_service_methods
+class AnalyticsService:
+    """Сервіс для аналітики по денних підсумках замовлень."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.order_rollups_daily
+
+    @staticmethod
+    def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+        """Приводить дату з часовою зоною до naive UTC (як зберігає MongoDB)."""
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def _day_start(value: datetime) -> datetime:
+        """Початок дня (UTC) для дати."""
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def _get_changed_days(self, watermark: datetime) -> list:
+        """Дні, в яких є замовлення, змінені після watermark."""
+        pipeline = [
+            {"$match": {"updated_at": {"$gte": watermark}}},
+            {"$group": {"_id": {"$dateTrunc": {"date": "$created_at", "unit": "day"}}}},
+        ]
+        rows = await self.db.orders.aggregate(pipeline).to_list(length=None)
+        return sorted(row["_id"] for row in rows if row["_id"])
+
+    async def refresh_rollups(self) -> int:
+        """
+        Інкрементально оновлює денні підсумки.
+        Повертає кількість перерахованих днів (або -1 при повному перерахунку).
+        """
+        started_at = datetime.utcnow()
+        watermark_doc = await self.db.stats.find_one({"_id": ROLLUP_WATERMARK_ID})
+        watermark = watermark_doc.get("watermark") if watermark_doc else None
+
+        if watermark is None:
+            # Перший запуск - перераховуємо всю історію
+            match = {"created_at": {"$ne": None}}
+            changed_days = -1
+        else:
+            days = await self._get_changed_days(watermark)
+            if not days:
+                await self._save_watermark(started_at)
+                return 0
+            match = {"$or": [
+                {"created_at": {"$gte": day, "$lt": day + timedelta(days=1)}}
+                for day in days
+            ]}
+            changed_days = len(days)
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
+                "orders": {"$sum": 1},
+                "revenue": {"$sum": "$total_amount"},
+                "paid_orders": {"$sum": {"$cond": [{"$eq": ["$payment_status", "paid"]}, 1, 0]}},
+                "paid_revenue": {"$sum": {"$cond": [
+                    {"$eq": ["$payment_status", "paid"]}, "$total_amount", 0,
+                ]}},
+                "cancelled_orders": {"$sum": {"$cond": [{"$eq": ["$order_status", "cancelled"]}, 1, 0]}},
+            }},
+            {"$set": {"updated_at": started_at}},
+            {"$merge": {
+                "into": self.collection.name,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+        await self.db.orders.aggregate(pipeline).to_list(length=None)
+        await self._save_watermark(started_at)
+
+        logger.info(f"Оновлено денні підсумки замовлень (днів: {'всі' if changed_days < 0 else changed_days})")
+        return changed_days
+
+    async def _save_watermark(self, watermark: datetime):
+        """Зберігає позначку останнього оновлення підсумків."""
+        await self.db.stats.update_one(
+            {"_id": ROLLUP_WATERMARK_ID},
+            {"$set": {"watermark": watermark}},
+            upsert=True,
+        )
+
+    async def get_revenue_analytics(
+        self,
+        granularity: str = "day",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> dict:
+        """
+        Повертає виручку та кількість замовлень по періодах (day, week, month).
+        Читає лише денні підсумки, тому вартість не залежить від кількості замовлень.
+        """
+        if granularity not in DEFAULT_RANGES:
+            raise ValidationError(f"Невірна гранулярність. Дозволені: {', '.join(DEFAULT_RANGES)}")
+
+        date_to = self._to_naive_utc(date_to) or datetime.utcnow()
+        date_from = self._to_naive_utc(date_from) or (date_to - DEFAULT_RANGES[granularity])
+        if date_from > date_to:
+            raise ValidationError("date_from має бути раніше за date_to")
+
+        try:
+            period = {"$dateTrunc": {"date": "$_id", "unit": granularity}}
+            if granularity == "week":
+                period["$dateTrunc"]["startOfWeek"] = "monday"
+            pipeline = [
+                {"$match": {"_id": {"$gte": self._day_start(date_from), "$lte": date_to}}},
+                {"$group": {
+                    "_id": period,
+                    "orders": {"$sum": "$orders"},
+                    "revenue": {"$sum": "$revenue"},
+                    "paid_orders": {"$sum": "$paid_orders"},
+                    "paid_revenue": {"$sum": "$paid_revenue"},
+                    "cancelled_orders": {"$sum": "$cancelled_orders"},
+                }},
+                {"$sort": {"_id": 1}},
+            ]
+            rows = await self.collection.aggregate(pipeline).to_list(length=None)
+            watermark_doc = await self.db.stats.find_one({"_id": ROLLUP_WATERMARK_ID})
+
+            buckets = [
+                {
+                    "period_start": row["_id"].isoformat(),
+                    "orders": row["orders"],
+                    "revenue": row["revenue"],
+                    "paid_orders": row["paid_orders"],
+                    "paid_revenue": row["paid_revenue"],
+                    "cancelled_orders": row["cancelled_orders"],
+                }
+                for row in rows
+            ]
+
+            refreshed_at = watermark_doc.get("watermark") if watermark_doc else None
+            return {
+                "granularity": granularity,
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat(),
+                "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+                "buckets": buckets,
+            }
+
+        except Exception as e:
+            logger.error(f"Помилка при отриманні аналітики виручки: {str(e)}")
+            raise DatabaseError(f"Не вдалося отримати аналітику: {str(e)}")
+
+
+def get_analytics_service() -> AnalyticsService:
+    """Отримує екземпляр AnalyticsService."""
+    db = MongoDB.get_database()
+    return AnalyticsService(db)
@@ -2,24 +2,52 @@
 Сервіс для автентифікації та роботи з користувачами.
 """
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from loguru import logger
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.core.database import MongoDB
 from app.models.user import User, UserCreate, UserResponse
-from app.models.auth import TokenResponse
+from app.models.auth import TokenData, TokenResponse
 from app.utils.security import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
-    create_refresh_token,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
 )
-from app.core.exceptions import UnauthorizedError, ConflictError, NotFoundError
+from app.core.exceptions import UnauthorizedError, ConflictError, NotFoundError, DatabaseError
+from app.core.db_monitoring import tag_service_methods
 from app.core.config import settings
+from app.core.indexes import EMAIL_COLLATION
+from app.services.stats_service import StatsService
+from app.services.token_service import TokenService
+from app.utils.cache import MISSING, TTLCache
 
 
+# Кеш існування та ролі користувачів для перевірки токенів:
+# user_id -> {"is_admin": bool} або None, якщо користувача немає
+user_auth_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+    name="auth_users",
+)
+
+# Лічильники перевірок користувача з токена
+user_check_stats = {"db_lookups": 0, "saved_lookups": 0}
+
+
+def invalidate_user_auth(user_id: Optional[str] = None):
+    """
+    Скидає закешований стан користувача (або всіх користувачів).
+    Викликається TokenService при відкликанні сесій користувача - у воркері,
+    що відкликав, і в інших при синхронізації відкликань. Зміна ролі чи
+    пароля має відкликати сесії користувача (revoke_user_sessions).
+    """
+    user_auth_cache.invalidate(user_id)
+
+
+@tag_service_methods
 class AuthService:
     """Сервіс для автентифікації."""
     
@@ -28,8 +56,8 @@ class AuthService:
         self.collection = db.users
     
     async def get_user_by_email(self, email: str) -> Optional[dict]:
-        """Знаходить користувача за email."""
-        user = await self.collection.find_one({"email": email})
+        """Знаходить користувача за email (без урахування регістру)."""
+        user = await self.collection.find_one({"email": email}, collation=EMAIL_COLLATION)
         return user
     
     async def get_user_by_id(self, user_id: str) -> Optional[dict]:
@@ -41,17 +69,54 @@ class AuthService:
             logger.error(f"Помилка при пошуку користувача за ID: {str(e)}")
             return None
     
+    async def _load_auth_state(self, user_id: str) -> Optional[dict]:
+        """
+        Читає з БД лише те, що потрібно для перевірки токена.
+        None - користувача немає; помилка БД викидає DatabaseError
+        (щоб збій не закешувався як "користувача не існує").
+        """
+        if not ObjectId.is_valid(user_id):
+            return None
+        user_check_stats["db_lookups"] += 1
+        try:
+            user = await self.collection.find_one({"_id": ObjectId(user_id)}, {"is_admin": 1})
+        except Exception as e:
+            logger.error(f"Помилка при пошуку користувача за ID: {str(e)}")
+            raise DatabaseError("Не вдалося перевірити користувача")
+        return {"is_admin": user.get("is_admin", False)} if user else None
+    
+    async def check_token_user(self, token_data: TokenData) -> Optional[TokenData]:
+        """
+        Перевіряє, що користувач з токена існує, і підставляє актуальну роль.
+        Повертає None, якщо користувача немає; при помилці БД викидає
+        DatabaseError (і нічого не кешує).
+        Режим задається AUTH_USER_CHECK_MODE (always, cached, off).
+        """
+        mode = settings.AUTH_USER_CHECK_MODE
+        if mode == "off":
+            user_check_stats["saved_lookups"] += 1
+            return token_data
+        
+        state = user_auth_cache.get(token_data.user_id) if mode == "cached" else MISSING
+        if state is MISSING:
+            state = await self._load_auth_state(token_data.user_id)
+            if mode == "cached":
+                user_auth_cache.set(token_data.user_id, state)
+        else:
+            user_check_stats["saved_lookups"] += 1
+        
+        if state is None:
+            return None
+        if state["is_admin"] != token_data.is_admin:
+            token_data = token_data.model_copy(update={"is_admin": state["is_admin"]})
+        return token_data
+    
     async def create_user(self, user_data: UserCreate) -> dict:
         """
         Створює нового користувача.
         """
-        # Перевіряємо, чи не існує вже користувач з таким email
-        existing_user = await self.get_user_by_email(user_data.email)
-        if existing_user:
-            raise ConflictError(f"Користувач з email {user_data.email} вже існує")
-        
         # Хешуємо пароль
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         
         # Створюємо документ користувача
         now = datetime.utcnow()
@@ -64,11 +129,15 @@ class AuthService:
             "updated_at": now,
         }
         
-        # Вставляємо в БД
-        result = await self.collection.insert_one(user_doc)
+        # Вставляємо в БД (унікальність email без урахування регістру гарантує індекс)
+        try:
+            result = await self.collection.insert_one(user_doc)
+        except DuplicateKeyError:
+            raise ConflictError(f"Користувач з email {user_data.email} вже існує")
         
         # Отримуємо створеного користувача
         created_user = await self.collection.find_one({"_id": result.inserted_id})
+        await StatsService(self.db).increment_counters(StatsService.user_counters(user_doc))
         logger.info(f"Створено нового користувача: {user_data.email}")
         
         return created_user
@@ -82,11 +151,31 @@ class AuthService:
         if not user:
             return None
         
-        if not verify_password(password, user["hashed_password"]):
+        if not await verify_password_async(password, user["hashed_password"]):
             return None
         
+        # Вартість bcrypt змінилась - перехешовуємо пароль, поки він відомий
+        if password_needs_rehash(user["hashed_password"]):
+            await self._rehash_password(user, password)
+        
         return user
     
+    async def _rehash_password(self, user: dict, password: str):
+        """
+        Оновлює хеш пароля з поточною вартістю bcrypt.
+        Записує лише якщо хеш не змінився паралельно; помилка не перериває вхід.
+        """
+        try:
+            new_hash = await get_password_hash_async(password)
+            await self.collection.update_one(
+                {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+                {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}},
+            )
+            user["hashed_password"] = new_hash
+            logger.info(f"Хеш пароля користувача {user['email']} оновлено до вартості {settings.BCRYPT_ROUNDS}")
+        except Exception as e:
+            logger.warning(f"Не вдалося оновити хеш пароля користувача {user.get('email')}: {str(e)}")
+    
     async def login(self, email: str, password: str) -> TokenResponse:
         """
         Виконує вхід користувача та повертає токени.
@@ -95,26 +184,12 @@ class AuthService:
         if not user:
             raise UnauthorizedError("Невірний email або пароль")
         
-        # Створюємо токени
-        token_data = {
-            "sub": str(user["_id"]),
-            "email": user["email"],
-            "is_admin": user.get("is_admin", False),
-        }
-        
-        access_token = create_access_token(
-            token_data,
-            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-        )
-        refresh_token = create_refresh_token(token_data)
+        # Створюємо нову сесію з парою токенів
+        tokens = await TokenService(self.db).create_session(user)
         
         logger.info(f"Користувач {email} успішно увійшов в систему")
         
-        return TokenResponse(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            token_type="bearer",
-        )
+        return tokens
 
 
 # Глобальний екземпляр сервісу (буде ініціалізовано після підключення БД)
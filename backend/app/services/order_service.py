@@ -6,21 +6,30 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ASCENDING, UpdateMany, UpdateOne, ReturnDocument
 from loguru import logger
 
 from app.core.database import MongoDB
 from app.models.order import OrderCreate, Order
 from app.models.product import Product
 from app.services.product_service import get_product_service
+from app.services.stats_service import StatsService
 from app.core.exceptions import NotFoundError, DatabaseError, ValidationError
+from app.core.db_monitoring import tag_service_methods
+from app.core.timing import timed
 
 
+# Службові поля замовлення (мітка запиту масової зміни статусів)
+INTERNAL_ORDER_FIELDS = {"status_batch_id"}
+
+@tag_service_methods
 class OrderService:
     """Сервіс для управління замовленнями."""
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.collection = db.orders
+        self.stats = StatsService(db)
     
     @staticmethod
     def _calculate_delivery_cost(items_total: float, delivery_method: str) -> float:
@@ -46,9 +55,9 @@ class OrderService:
         Перевіряє наявність товарів та підраховує загальну суму.
         """
         try:
-            # Отримуємо product_service
-            from app.services.product_service import get_product_service
-            product_service = get_product_service()
+            # Наявність і ціну перевіряємо на primary (не зі застарілої репліки)
+            from app.services.product_service import ProductService
+            product_service = ProductService(MongoDB.get_database())
             total_amount = 0.0
             validated_items = []
             
@@ -107,6 +116,7 @@ class OrderService:
             
             result = await self.collection.insert_one(order_doc)
             created_order = await self.collection.find_one({"_id": result.inserted_id})
+            await self.stats.increment_counters(StatsService.order_counters(order_doc))
             
             logger.info(f"Створено замовлення: ID {result.inserted_id}, сума: {total_amount + delivery_cost} UAH")
             
@@ -119,6 +129,12 @@ class OrderService:
             raise DatabaseError(f"Не вдалося створити замовлення: {str(e)}")
     
     @staticmethod
+    def _status_condition(order: dict) -> tuple:
+        """Прочитані статуси замовлення для умови запису (None - поле відсутнє)."""
+        return order.get("order_status"), order.get("payment_status")
+    
+    @staticmethod
+    @timed("serialize")
     def _serialize_order(order: dict) -> dict:
         """
         Конвертує Mongo документ у серіалізований dict з id та iso-датами.
@@ -130,6 +146,9 @@ class OrderService:
         serialized = {}
         
         for key, value in order.items():
+            # Службові поля не віддаються клієнтам
+            if key in INTERNAL_ORDER_FIELDS:
+                continue
             # Обробляємо _id окремо - конвертуємо в id
             if key == "_id":
                 serialized["id"] = str(value)
@@ -208,11 +227,6 @@ class OrderService:
         Оновлює статус замовлення.
         """
         try:
-            # Перевіряємо існування замовлення
-            existing_order_raw = await self.collection.find_one({"_id": ObjectId(order_id)})
-            if not existing_order_raw:
-                raise NotFoundError("Замовлення", order_id)
-            
             update_data = {"updated_at": datetime.utcnow()}
             
             if order_status:
@@ -220,13 +234,22 @@ class OrderService:
             if payment_status:
                 update_data["payment_status"] = payment_status
             
-            await self.collection.update_one(
+            # Одним запитом оновлюємо та отримуємо попередній стан (для лічильників)
+            existing_order_raw = await self.collection.find_one_and_update(
                 {"_id": ObjectId(order_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE,
             )
+            if not existing_order_raw:
+                raise NotFoundError("Замовлення", order_id)
+            
+            updated_order_raw = {**existing_order_raw, **update_data}
+            await self.stats.increment_counters(StatsService.diff_counters(
+                StatsService.order_counters(existing_order_raw),
+                StatsService.order_counters(updated_order_raw),
+            ))
             
-            updated_order_raw = await self.collection.find_one({"_id": ObjectId(order_id)})
-            updated_order = self._serialize_order(updated_order_raw) if updated_order_raw else None
+            updated_order = self._serialize_order(updated_order_raw)
             logger.info(f"Оновлено статус замовлення {order_id}")
             
             return updated_order
@@ -236,10 +259,172 @@ class OrderService:
         except (InvalidId, Exception) as e:
             logger.error(f"Помилка при оновленні статусу замовлення {order_id}: {str(e)}")
             raise DatabaseError(f"Не вдалося оновити статус замовлення: {str(e)}")
+    
+    async def bulk_update_order_status(
+        self,
+        order_ids: Optional[List[str]] = None,
+        filter_query: Optional[dict] = None,
+        updates: Optional[List[dict]] = None,
+        order_status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        limit: int = 500,
+    ) -> dict:
+        """
+        Масово оновлює статуси замовлень.
+        Усі зміни записуються одним bulk_write. Кожна операція умовна:
+        замовлення оновлюється, лише якщо його order_status та payment_status
+        не змінились після читання, тож лічильники дашборду рахуються тільки
+        для операцій, що спрацювали; решта повертається як conflict.
+        За фільтром обробляється не більше limit найстаріших замовлень
+        (детермінований порядок created_at, _id); truncated та remaining
+        показують, чи залишились інші замовлення, що відповідають фільтру.
+        Повертає підсумок та результат для кожного замовлення.
+        """
+        try:
+            results = []
+            changes = {}  # ObjectId -> {"order_status": ..., "payment_status": ...}
+            
+            if updates is not None:
+                for update in updates:
+                    order_id = update["order_id"]
+                    if not ObjectId.is_valid(order_id):
+                        results.append({"order_id": order_id, "result": "invalid_id"})
+                        continue
+                    changes[ObjectId(order_id)] = {
+                        "order_status": update.get("order_status"),
+                        "payment_status": update.get("payment_status"),
+                    }
+                query = {"_id": {"$in": list(changes)}}
+            elif order_ids is not None:
+                for order_id in order_ids:
+                    if not ObjectId.is_valid(order_id):
+                        results.append({"order_id": order_id, "result": "invalid_id"})
+                        continue
+                    changes[ObjectId(order_id)] = {
+                        "order_status": order_status,
+                        "payment_status": payment_status,
+                    }
+                query = {"_id": {"$in": list(changes)}}
+            else:
+                if not filter_query:
+                    # Порожній фільтр оновив би довільні замовлення
+                    raise ValidationError("Фільтр не може бути порожнім: вкажіть хоча б одну умову")
+                query = filter_query
+            
+            # Одним запитом отримуємо замовлення, які існують
+            # (за фільтром - на одне більше за ліміт, щоб знати, чи є ще)
+            cursor = self.collection.find(
+                query,
+                {"order_status": 1, "payment_status": 1, "total_amount": 1},
+            )
+            truncated = False
+            remaining = 0
+            if filter_query is not None:
+                existing = await cursor.sort([("created_at", ASCENDING), ("_id", ASCENDING)]).limit(
+                    limit + 1
+                ).to_list(length=limit + 1)
+                if len(existing) > limit:
+                    truncated = True
+                    existing = existing[:limit]
+                    remaining = await self.collection.count_documents(query) - limit
+            else:
+                existing = await cursor.to_list(length=None)
+            existing_ids = {order["_id"] for order in existing}
+            
+            if filter_query is not None:
+                changes = {
+                    order["_id"]: {"order_status": order_status, "payment_status": payment_status}
+                    for order in existing
+                }
+            
+            for oid in changes:
+                if oid not in existing_ids:
+                    results.append({"order_id": str(oid), "result": "not_found"})
+            
+            now = datetime.utcnow()
+            target_ids = [oid for oid in changes if oid in existing_ids]
+            previous = {order["_id"]: order for order in existing}
+            modified = 0
+            applied_ids = set(target_ids)
+            
+            if target_ids:
+                # Мітка запиту: за нею визначаються операції, що спрацювали
+                batch_id = ObjectId()
+                operations = []
+                if updates is None:
+                    # Однакові зміни: один UpdateMany на кожну пару попередніх статусів
+                    update_data = {"updated_at": now, "status_batch_id": batch_id}
+                    if order_status:
+                        update_data["order_status"] = order_status
+                    if payment_status:
+                        update_data["payment_status"] = payment_status
+                    groups = {}
+                    for oid in target_ids:
+                        groups.setdefault(self._status_condition(previous[oid]), []).append(oid)
+                    for (prev_order_status, prev_payment_status), ids in groups.items():
+                        operations.append(UpdateMany(
+                            {"_id": {"$in": ids}, "order_status": prev_order_status, "payment_status": prev_payment_status},
+                            {"$set": update_data},
+                        ))
+                else:
+                    for oid in target_ids:
+                        update_data = {"updated_at": now, "status_batch_id": batch_id}
+                        update_data.update({k: v for k, v in changes[oid].items() if v})
+                        prev_order_status, prev_payment_status = self._status_condition(previous[oid])
+                        operations.append(UpdateOne(
+                            {"_id": oid, "order_status": prev_order_status, "payment_status": prev_payment_status},
+                            {"$set": update_data},
+                        ))
+                result = await self.collection.bulk_write(operations, ordered=False)
+                modified = result.modified_count
+                if result.matched_count < len(target_ids):
+                    # Частину замовлень змінили паралельно - перечитуємо, які оновлено цим запитом
+                    applied = await self.collection.find(
+                        {"_id": {"$in": target_ids}, "status_batch_id": batch_id},
+                        {"_id": 1},
+                    ).to_list(length=None)
+                    applied_ids = {order["_id"] for order in applied}
+            
+            deltas = {}
+            for oid in target_ids:
+                if oid not in applied_ids:
+                    results.append({"order_id": str(oid), "result": "conflict"})
+                    continue
+                change = changes[oid]
+                updated = {**previous[oid], **{k: v for k, v in change.items() if v}}
+                for key, value in StatsService.diff_counters(
+                    StatsService.order_counters(previous[oid]),
+                    StatsService.order_counters(updated),
+                ).items():
+                    deltas[key] = deltas.get(key, 0) + value
+                results.append({
+                    "order_id": str(oid),
+                    "result": "updated",
+                    "order_status": change["order_status"] or previous[oid].get("order_status"),
+                    "payment_status": change["payment_status"] or previous[oid].get("payment_status"),
+                })
+            
+            await self.stats.increment_counters({k: v for k, v in deltas.items() if v})
+            logger.info(f"Масово оновлено статуси {len(applied_ids)} замовлень")
+            
+            return {
+                "matched": len(applied_ids),
+                "modified": modified,
+                "conflicts": len(target_ids) - len(applied_ids),
+                "truncated": truncated,
+                "remaining": max(0, remaining),
+                "results": results,
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при масовому оновленні статусів замовлень: {str(e)}")
+            raise DatabaseError(f"Не вдалося оновити статуси замовлень: {str(e)}")
 
 
 def get_order_service() -> OrderService:
     """Отримує екземпляр OrderService."""
-    db = MongoDB.get_database()
+    db = MongoDB.get_orders_database()
     return OrderService(db)
 
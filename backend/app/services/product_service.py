@@ -6,22 +6,80 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from loguru import logger
 
 from app.core.database import MongoDB
 from app.models.product import ProductCreate, ProductUpdate, Product
 from app.models.common import PaginationParams, ProductFilters
 from app.core.exceptions import NotFoundError, DatabaseError, ValidationError
+from app.core.db_monitoring import tag_service_methods
+from app.core.timing import timed
+from app.services.stats_service import StatsService
 
 
+# Порожня гістограма оцінок (1-5 зірок)
+EMPTY_RATING_HISTOGRAM = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+
+# Проєкція для списків товарів (без вбудованих останніх відгуків)
+LISTING_PROJECTION = {"review_summary.latest": 0}
+
+
+def rating_star(rating: float) -> str:
+    """Кошик гістограми для оцінки: округлення до найближчої зірки (4.5 -> "5")."""
+    return str(min(5, max(1, int(rating + 0.5))))
+
+
+def rating_delta_pipeline(
+    sum_delta: float,
+    count_delta: int,
+    histogram_deltas: Optional[dict] = None,
+) -> list:
+    """
+    Pipeline-оновлення рейтингу товару: додає дельти до rating_sum,
+    rating_count та rating_histogram і перераховує середній rating в тому ж записі.
+    Для старих документів без rating_sum сума відновлюється як rating * rating_count.
+    """
+    legacy_sum = {"$multiply": [{"$ifNull": ["$rating", 0]}, {"$ifNull": ["$rating_count", 0]}]}
+    histogram_changes = {
+        star: {"$max": [0, {"$add": [{"$ifNull": [f"$rating_histogram.{star}", 0]}, delta]}]}
+        for star, delta in (histogram_deltas or {}).items()
+        if delta
+    }
+    return [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", legacy_sum]}, sum_delta]},
+            "rating_count": {"$max": [0, {"$add": [{"$ifNull": ["$rating_count", 0]}, count_delta]}]},
+            "rating_histogram": {"$mergeObjects": [
+                EMPTY_RATING_HISTOGRAM,
+                {"$ifNull": ["$rating_histogram", {}]},
+                histogram_changes,
+            ]},
+        }},
+        {"$set": {
+            "rating": {"$cond": [
+                {"$gt": ["$rating_count", 0]},
+                {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 2]},
+                0.0,
+            ]},
+        }},
+    ]
+
+
+@tag_service_methods
 class ProductService:
     """Сервіс для управління товарами."""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, catalog_db: Optional[AsyncIOMotorDatabase] = None):
         self.db = db
+        # Записи та читання після запису - завжди через основну базу (primary)
         self.collection = db.products
+        # Лише читання каталогу (список, пошук, картка) - з read preference каталогу
+        self.catalog = (catalog_db if catalog_db is not None else db).products
+        self.stats = StatsService(db)
 
     @staticmethod
+    @timed("serialize")
     def _serialize_product(product: dict) -> dict:
         """
         Конвертує Mongo документ у серіалізований dict з id та iso-датами.
@@ -44,6 +102,12 @@ class ProductService:
             # Обробляємо вкладені dict
             elif isinstance(value, dict):
                 serialized[key] = ProductService._serialize_product(value)
+            # Обробляємо списки (наприклад, review_summary.latest)
+            elif isinstance(value, list):
+                serialized[key] = [
+                    ProductService._serialize_product(item) if isinstance(item, dict) else item
+                    for item in value
+                ]
             # Всі інші типи залишаємо як є
             else:
                 serialized[key] = value
@@ -53,38 +117,26 @@ class ProductService:
     async def rate_product(self, product_id: str, rating: float) -> dict:
         """
         Додає оцінку товару та оновлює середній рейтинг.
+        Виконується одним find_one_and_update з pipeline-оновленням.
         """
         try:
             if not ObjectId.is_valid(product_id):
                 raise ValidationError(f"Невірний ID товару: {product_id}")
             
-            product = await self.collection.find_one({"_id": ObjectId(product_id)})
-            if not product:
-                raise NotFoundError("Товар", product_id)
-            
-            current_rating = product.get("rating", 0.0)
-            current_count = product.get("rating_count", 0)
-            
-            # Обчислюємо новий середній рейтинг
-            new_count = current_count + 1
-            new_rating = ((current_rating * current_count) + rating) / new_count
-            
-            # Оновлюємо товар
-            await self.collection.update_one(
+            # Одне атомарне оновлення: конкурентні оцінки не втрачаються
+            updated_product = await self.collection.find_one_and_update(
                 {"_id": ObjectId(product_id)},
-                {
-                    "$set": {
-                        "rating": round(new_rating, 2),
-                        "rating_count": new_count,
-                        "updated_at": datetime.utcnow(),
-                    }
-                }
+                rating_delta_pipeline(rating, 1, {rating_star(rating): 1})
+                + [{"$set": {"updated_at": "$$NOW"}}],
+                return_document=ReturnDocument.AFTER,
             )
+            if not updated_product:
+                raise NotFoundError("Товар", product_id)
             
-            # Повертаємо оновлений товар
-            updated_product = await self.collection.find_one({"_id": ObjectId(product_id)})
             return self._serialize_product(updated_product)
             
+        except (NotFoundError, ValidationError):
+            raise
         except InvalidId:
             raise ValidationError(f"Невірний ID товару: {product_id}")
         except Exception as e:
@@ -112,12 +164,16 @@ class ProductService:
                 "is_active": product_data.is_active,
                 "rating": product_data.rating,
                 "rating_count": product_data.rating_count,
+                "rating_sum": product_data.rating * product_data.rating_count,
+                "rating_histogram": dict(EMPTY_RATING_HISTOGRAM),
+                "review_summary": {"count": 0, "rating_sum": 0.0, "average": 0.0, "latest": []},
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
             }
             
             result = await self.collection.insert_one(product_doc)
             created_product = await self.collection.find_one({"_id": result.inserted_id})
+            await self.stats.increment_counters(StatsService.product_counters(product_doc))
             
             logger.info(f"Створено товар: {product_data.name} (ID: {result.inserted_id})")
             return self._serialize_product(created_product)
@@ -131,7 +187,7 @@ class ProductService:
         Отримує товар за ID.
         """
         try:
-            product = await self.collection.find_one({"_id": ObjectId(product_id)})
+            product = await self.catalog.find_one({"_id": ObjectId(product_id)})
             return self._serialize_product(product)
         except (InvalidId, Exception) as e:
             logger.warning(f"Помилка при пошуку товару за ID {product_id}: {str(e)}")
@@ -161,10 +217,11 @@ class ProductService:
                 query.update(filter_query)
             
             # Підрахунок загальної кількості
-            total = await self.collection.count_documents(query)
+            total = await self.catalog.count_documents(query)
             
             # Отримуємо товари з пагінацією
-            cursor = self.collection.find(query).skip(pagination.skip).limit(pagination.limit).sort("created_at", -1)
+            # Останні відгуки з review_summary потрібні лише на сторінці товару
+            cursor = self.catalog.find(query, LISTING_PROJECTION).skip(pagination.skip).limit(pagination.limit).sort("created_at", -1)
             products_raw = await cursor.to_list(length=pagination.limit)
             products = [self._serialize_product(p) for p in products_raw]
             
@@ -179,32 +236,36 @@ class ProductService:
         Оновлює товар.
         """
         try:
-            # Перевіряємо, чи існує товар
-            existing_product = await self.get_product_by_id(product_id)
-            if not existing_product:
-                raise NotFoundError("Товар", product_id)
-            
             # Формуємо дані для оновлення (тільки поля, які передані)
             update_data = product_data.model_dump(exclude_unset=True)
             
             if not update_data:
-                # Якщо немає даних для оновлення, повертаємо існуючий товар
-                return existing_product
+                # Якщо немає даних для оновлення, повертаємо існуючий товар (з primary)
+                existing_product = await self.collection.find_one({"_id": ObjectId(product_id)})
+                if not existing_product:
+                    raise NotFoundError("Товар", product_id)
+                return self._serialize_product(existing_product)
             
             # Додаємо updated_at
             update_data["updated_at"] = datetime.utcnow()
             
-            # Оновлюємо
-            await self.collection.update_one(
+            # Оновлюємо на primary, отримуючи стан до і після атомарно
+            existing_product = await self.collection.find_one_and_update(
                 {"_id": ObjectId(product_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE,
             )
+            if not existing_product:
+                raise NotFoundError("Товар", product_id)
+            updated_product = {**existing_product, **update_data}
             
-            # Отримуємо оновлений товар
-            updated_product = await self.get_product_by_id(product_id)
+            await self.stats.increment_counters(StatsService.diff_counters(
+                StatsService.product_counters(existing_product),
+                StatsService.product_counters(updated_product),
+            ))
             logger.info(f"Оновлено товар: {product_id}")
             
-            return updated_product
+            return self._serialize_product(updated_product)
             
         except NotFoundError:
             raise
@@ -217,15 +278,18 @@ class ProductService:
         Видаляє товар (soft delete - встановлює is_active = False).
         """
         try:
-            existing_product = await self.get_product_by_id(product_id)
-            if not existing_product:
-                raise NotFoundError("Товар", product_id)
-            
-            # Soft delete
-            await self.collection.update_one(
+            # Soft delete (на primary, зі станом до зміни для лічильників)
+            existing_product = await self.collection.find_one_and_update(
                 {"_id": ObjectId(product_id)},
-                {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+                {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
+                return_document=ReturnDocument.BEFORE,
             )
+            if not existing_product:
+                raise NotFoundError("Товар", product_id)
+            await self.stats.increment_counters(StatsService.diff_counters(
+                StatsService.product_counters(existing_product),
+                StatsService.product_counters({**existing_product, "is_active": False}),
+            ))
             
             logger.info(f"Видалено товар (soft delete): {product_id}")
             return True
@@ -254,11 +318,11 @@ class ProductService:
                 ]
             }
             
-            cursor = self.collection.find(query).limit(limit).sort("created_at", -1)
+            cursor = self.catalog.find(query, LISTING_PROJECTION).limit(limit).sort("created_at", -1)
             products = await cursor.to_list(length=limit)
             products_serialized = [self._serialize_product(p) for p in products]
             
-            logger.info(f"Пошук '{search_query}': знайдено {len(products)} товарів")
+            logger.debug(f"Пошук '{search_query}': знайдено {len(products)} товарів")
             return products_serialized
             
         except Exception as e:
@@ -267,8 +331,10 @@ class ProductService:
 
 
 def get_product_service() -> ProductService:
-    """Отримує екземпляр ProductService."""
-    db = MongoDB.get_database()
-    return ProductService(db)
+    """
+    Отримує екземпляр ProductService: записи йдуть в основну базу,
+    читання каталогу - з read preference MONGODB_CATALOG_READ_PREFERENCE.
+    """
+    return ProductService(MongoDB.get_database(), MongoDB.get_catalog_database())
 
 
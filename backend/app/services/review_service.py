@@ -6,12 +6,164 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 
 from app.models.review import ReviewCreate, ReviewUpdate, Review
 from app.core.exceptions import NotFoundError, DatabaseError, ValidationError
+from app.core.db_monitoring import tag_service_methods
+from app.core.timing import timed
+from app.core.config import settings
+from app.utils.cache import SingleFlightCache
+from app.utils.minhash import MinHashLSH
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_filter
+from app.services.product_service import (
+    EMPTY_RATING_HISTOGRAM,
+    rating_delta_pipeline,
+    rating_star,
+)
 
 
+# Варіанти сортування відгуків товару (keyset по полях + _id)
+REVIEW_SORTS = {
+    "newest": [("created_at", -1), ("_id", -1)],
+    "rating_desc": [("rating", -1), ("_id", -1)],
+    "rating_asc": [("rating", 1), ("_id", 1)],
+    "helpful": [("helpful_count", -1), ("_id", -1)],
+}
+
+
+def review_summary_item(review: dict) -> dict:
+    """Короткий відгук для вбудованого review_summary.latest товару."""
+    return {
+        "id": str(review["_id"]),
+        "user_name": review.get("user_name"),
+        "rating": review["rating"],
+        "comment": review.get("comment"),
+        "created_at": review.get("created_at"),
+    }
+
+
+def review_summary_pipeline(
+    count_delta: int,
+    sum_delta: float,
+    added: List[dict],
+    removed_ids: List[str],
+    latest_limit: int,
+) -> list:
+    """
+    Pipeline-стадії оновлення вбудованого review_summary товару:
+    кількість та середня оцінка схвалених відгуків і останні latest_limit відгуків.
+    Виконуються в тому ж записі, що й оновлення рейтингу.
+    """
+    replaced_ids = removed_ids + [item["id"] for item in added]
+    kept = {"$filter": {
+        "input": {"$ifNull": ["$review_summary.latest", []]},
+        "cond": {"$not": [{"$in": ["$$this.id", {"$literal": replaced_ids}]}]},
+    }}
+    return [
+        {"$set": {
+            "review_summary.count": {"$max": [0, {"$add": [{"$ifNull": ["$review_summary.count", 0]}, count_delta]}]},
+            "review_summary.rating_sum": {"$add": [{"$ifNull": ["$review_summary.rating_sum", 0]}, sum_delta]},
+            "review_summary.latest": {"$slice": [
+                {"$sortArray": {
+                    "input": {"$concatArrays": [kept, {"$literal": added}]},
+                    "sortBy": {"created_at": -1},
+                }},
+                latest_limit,
+            ]},
+        }},
+        {"$set": {
+            "review_summary.average": {"$cond": [
+                {"$gt": ["$review_summary.count", 0]},
+                {"$round": [{"$divide": ["$review_summary.rating_sum", "$review_summary.count"]}, 2]},
+                0.0,
+            ]},
+        }},
+    ]
+
+
+def recalculated_rating_pipeline(review_sum: float, review_count: int, review_histogram: dict, summary: dict) -> list:
+    """
+    Pipeline-оновлення товару після перерахунку за відгуками.
+    Внесок відгуків (review_summary.rating_sum/count) замінюється перерахованим,
+    а решта рейтингу (rate_product, початкові дані) зберігається. Якщо
+    review_summary ще немає, увесь рейтинг вважається внеском відгуків.
+    Гістограма не опускається нижче поточної (її внесок відгуків окремо не зберігається).
+    """
+    stored_sum = {"$ifNull": ["$rating_sum", {"$multiply": [{"$ifNull": ["$rating", 0]}, {"$ifNull": ["$rating_count", 0]}]}]}
+    stored_count = {"$ifNull": ["$rating_count", 0]}
+    return [
+        {"$set": {
+            "rating_sum": {"$add": [
+                {"$subtract": [stored_sum, {"$ifNull": ["$review_summary.rating_sum", stored_sum]}]},
+                review_sum,
+            ]},
+            "rating_count": {"$add": [
+                {"$max": [0, {"$subtract": [stored_count, {"$ifNull": ["$review_summary.count", stored_count]}]}]},
+                review_count,
+            ]},
+            "rating_histogram": {
+                star: {"$max": [{"$ifNull": [f"$rating_histogram.{star}", 0]}, review_histogram.get(star, 0)]}
+                for star in EMPTY_RATING_HISTOGRAM
+            },
+            "review_summary": {"$literal": summary},
+        }},
+        {"$set": {
+            "rating": {"$cond": [
+                {"$gt": ["$rating_count", 0]},
+                {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 2]},
+                0.0,
+            ]},
+        }},
+    ]
+
+
+# Сортування черги модерації
+PENDING_REVIEWS_SORT = [("created_at", -1), ("_id", -1)]
+
+# Кешована кількість відгуків на модерацію
+pending_count_cache = SingleFlightCache(
+    ttl=settings.REVIEW_PENDING_COUNT_CACHE_SECONDS,
+    name="pending_reviews_count",
+)
+
+
+# Індекс майже однакових відгуків (схвалені та ті, що чекають модерації)
+duplicate_index = MinHashLSH(
+    num_perm=settings.REVIEW_MINHASH_PERMUTATIONS,
+    bands=settings.REVIEW_MINHASH_BANDS,
+)
+
+# Стан індексу дублікатів у процесі: поки він завантажується у фоні,
+# нові відгуки не групуються в кластери (кожен отримує власний)
+duplicate_index_state = {"ready": False}
+
+# Скільки відгуків обчислюється за один виклик у пулі потоків при завантаженні
+DUPLICATE_INDEX_BATCH_SIZE = 200
+
+# Максимум відгуків, що модеруються за один запит по кластеру
+CLUSTER_MODERATION_LIMIT = 500
+
+# Поля відгуку, потрібні масовій модерації (дельти рейтингу, review_summary, індекс дублікатів)
+BULK_MODERATION_PROJECTION = {
+    "product_id": 1,
+    "rating": 1,
+    "is_moderated": 1,
+    "is_approved": 1,
+    "user_name": 1,
+    "comment": 1,
+    "created_at": 1,
+    "duplicate_cluster_id": 1,
+}
+
+# Службові поля відгуку (мітка запиту масової модерації)
+INTERNAL_REVIEW_FIELDS = {"moderation_batch_id"}
+
+
+@tag_service_methods
 class ReviewService:
     """Сервіс для управління відгуками."""
     
@@ -20,6 +172,7 @@ class ReviewService:
         self.collection = db.reviews
     
     @staticmethod
+    @timed("serialize")
     def _serialize_review(review: dict) -> dict:
         """
         Конвертує Mongo документ у серіалізований dict з id та iso-датами.
@@ -30,6 +183,9 @@ class ReviewService:
         serialized = {}
         
         for key, value in review.items():
+            # Службові поля не віддаються клієнтам
+            if key in INTERNAL_REVIEW_FIELDS:
+                continue
             # Обробляємо _id окремо
             if key == "_id":
                 serialized["id"] = str(value)
@@ -61,28 +217,41 @@ class ReviewService:
             if not product:
                 raise NotFoundError("Товар", review_data.product_id)
             
-            # Перевіряємо чи користувач вже залишив відгук для цього товару
-            if user_id:
-                existing_review = await self.collection.find_one({
-                    "product_id": review_data.product_id,
-                    "user_id": user_id
-                })
-                if existing_review:
-                    raise ValidationError("Ви вже залишили відгук для цього товару")
+            # Шукаємо майже однаковий відгук: схожі потрапляють в один кластер
+            review_id = ObjectId()
+            # Сигнатура - чистий Python (десятки мс на довгий текст), тому поза event loop
+            signature = await run_in_threadpool(duplicate_index.signature, review_data.comment)
+            match = duplicate_index.best_match(signature) if duplicate_index_state["ready"] else None
+            if match and match[2] >= settings.REVIEW_DUPLICATE_THRESHOLD:
+                cluster_id, duplicate_score = match[1], match[2]
+            else:
+                cluster_id, duplicate_score = str(review_id), 0.0
             
             # Створюємо відгук
             review_dict = review_data.model_dump()
+            review_dict["_id"] = review_id
             review_dict["user_id"] = user_id
             review_dict["is_approved"] = False
             review_dict["is_moderated"] = False
+            review_dict["helpful_count"] = 0
+            review_dict["duplicate_cluster_id"] = cluster_id
+            review_dict["duplicate_score"] = round(duplicate_score, 3)
             review_dict["created_at"] = datetime.utcnow()
             review_dict["updated_at"] = datetime.utcnow()
             
-            result = await self.collection.insert_one(review_dict)
+            # Один відгук на користувача для товару гарантує унікальний індекс
+            try:
+                result = await self.collection.insert_one(review_dict)
+            except DuplicateKeyError:
+                raise ValidationError("Ви вже залишили відгук для цього товару")
             created_review = await self.collection.find_one({"_id": result.inserted_id})
             
-            # Оновлюємо рейтинг товару
-            await self._update_product_rating(review_data.product_id)
+            # Новий відгук ще не схвалений, тому рейтинг товару не змінюється
+            duplicate_index.add(str(review_id), signature, cluster_id)
+            pending_count_cache.invalidate()
+            
+            if duplicate_score:
+                logger.info(f"Відгук {review_id} схожий на кластер {cluster_id} (схожість {duplicate_score:.2f})")
             
             logger.info(f"Створено відгук {result.inserted_id} для товару {review_data.product_id}")
             return self._serialize_review(created_review)
@@ -119,6 +288,87 @@ class ReviewService:
             logger.error(f"Помилка при отриманні відгуків: {str(e)}")
             raise DatabaseError(f"Не вдалося отримати відгуки: {str(e)}")
     
+    async def get_reviews_page(
+        self,
+        product_id: str,
+        approved_only: bool = True,
+        sort: str = "newest",
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> dict:
+        """
+        Отримує сторінку відгуків товару з keyset пагінацією.
+        Повертає {"items", "next_cursor", "limit"}.
+        """
+        try:
+            if not ObjectId.is_valid(product_id):
+                raise ValidationError(f"Невірний ID товару: {product_id}")
+            if sort not in REVIEW_SORTS:
+                raise ValidationError(f"Невірне сортування. Дозволені: {', '.join(REVIEW_SORTS)}")
+            
+            sort_spec = REVIEW_SORTS[sort]
+            query = {"product_id": product_id}
+            if approved_only:
+                query["is_approved"] = True
+            if cursor:
+                query = {"$and": [query, keyset_filter(sort_spec, decode_cursor(cursor, sort))]}
+            
+            # Беремо на один більше, щоб знати, чи є наступна сторінка
+            reviews = await self.collection.find(query).sort(sort_spec).limit(limit + 1).to_list(length=limit + 1)
+            
+            next_cursor = None
+            if len(reviews) > limit:
+                reviews = reviews[:limit]
+                next_cursor = encode_cursor(sort, reviews[-1], sort_spec)
+            
+            return {
+                "items": [self._serialize_review(r) for r in reviews],
+                "next_cursor": next_cursor,
+                "limit": limit,
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при отриманні сторінки відгуків: {str(e)}")
+            raise DatabaseError(f"Не вдалося отримати відгуки: {str(e)}")
+    
+    async def mark_helpful(self, review_id: str, user_id: str) -> dict:
+        """
+        Позначає відгук як корисний (один голос від користувача).
+        """
+        try:
+            if not ObjectId.is_valid(review_id):
+                raise ValidationError(f"Невірний ID відгуку: {review_id}")
+            
+            review = await self.collection.find_one({"_id": ObjectId(review_id)}, {"_id": 1})
+            if not review:
+                raise NotFoundError("Відгук", review_id)
+            
+            try:
+                await self.db.review_votes.insert_one({
+                    "review_id": review_id,
+                    "user_id": user_id,
+                    "created_at": datetime.utcnow(),
+                })
+            except DuplicateKeyError:
+                raise ValidationError("Ви вже позначили цей відгук як корисний")
+            
+            updated = await self.collection.find_one_and_update(
+                {"_id": ObjectId(review_id)},
+                {"$inc": {"helpful_count": 1}},
+                projection={"helpful_count": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            
+            return {"id": review_id, "helpful_count": updated["helpful_count"] if updated else 0}
+            
+        except (NotFoundError, ValidationError):
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при позначенні відгуку {review_id} корисним: {str(e)}")
+            raise DatabaseError(f"Не вдалося позначити відгук: {str(e)}")
+    
     async def get_review_by_id(self, review_id: str) -> Optional[dict]:
         """
         Отримує відгук за ID.
@@ -142,26 +392,26 @@ class ReviewService:
             if not ObjectId.is_valid(review_id):
                 raise ValidationError(f"Невірний ID відгуку: {review_id}")
             
-            existing_review = await self.collection.find_one({"_id": ObjectId(review_id)})
-            if not existing_review:
-                raise NotFoundError("Відгук", review_id)
-            
             update_data = review_data.model_dump(exclude_unset=True)
             update_data["updated_at"] = datetime.utcnow()
             
-            await self.collection.update_one(
+            existing_review = await self.collection.find_one_and_update(
                 {"_id": ObjectId(review_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE,
             )
+            if not existing_review:
+                raise NotFoundError("Відгук", review_id)
+            
+            updated_review = {**existing_review, **update_data}
             
-            # Якщо змінився рейтинг або статус схвалення, оновлюємо рейтинг товару
-            if "rating" in update_data or "is_approved" in update_data:
-                await self._update_product_rating(existing_review["product_id"])
+            # Якщо змінився рейтинг або статус схвалення, застосовуємо різницю до рейтингу товару
+            await self._apply_rating_change(existing_review, updated_review)
+            await self._index_duplicate(updated_review, text_changed="comment" in update_data)
             
-            updated_review = await self.get_review_by_id(review_id)
             logger.info(f"Оновлено відгук: {review_id}")
             
-            return updated_review
+            return self._serialize_review(updated_review)
             
         except (NotFoundError, ValidationError):
             raise
@@ -177,16 +427,14 @@ class ReviewService:
             if not ObjectId.is_valid(review_id):
                 raise ValidationError(f"Невірний ID відгуку: {review_id}")
             
-            review = await self.collection.find_one({"_id": ObjectId(review_id)})
+            review = await self.collection.find_one_and_delete({"_id": ObjectId(review_id)})
             if not review:
                 raise NotFoundError("Відгук", review_id)
             
-            product_id = review["product_id"]
-            
-            await self.collection.delete_one({"_id": ObjectId(review_id)})
-            
-            # Оновлюємо рейтинг товару після видалення відгуку
-            await self._update_product_rating(product_id)
+            # Віднімаємо внесок видаленого відгуку з рейтингу товару
+            await self._apply_rating_change(review, None)
+            await self._index_duplicate(review, removed=True)
+            pending_count_cache.invalidate()
             
             logger.info(f"Видалено відгук: {review_id}")
             return True
@@ -212,6 +460,243 @@ class ReviewService:
             logger.error(f"Помилка при отриманні відгуків на модерацію: {str(e)}")
             raise DatabaseError(f"Не вдалося отримати відгуки: {str(e)}")
     
+    async def get_pending_reviews_page(self, cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """
+        Отримує сторінку черги модерації (keyset пагінація, новіші першими)
+        разом з кешованою кількістю відгуків у черзі.
+        """
+        try:
+            sort_spec = PENDING_REVIEWS_SORT
+            query = {"is_moderated": False}
+            if cursor:
+                query = {"$and": [query, keyset_filter(sort_spec, decode_cursor(cursor, "pending"))]}
+            
+            reviews = await self.collection.find(query).sort(sort_spec).limit(limit + 1).to_list(length=limit + 1)
+            
+            next_cursor = None
+            if len(reviews) > limit:
+                reviews = reviews[:limit]
+                next_cursor = encode_cursor("pending", reviews[-1], sort_spec)
+            
+            return {
+                "items": [self._serialize_review(r) for r in reviews],
+                "next_cursor": next_cursor,
+                "limit": limit,
+                "pending_count": await self.get_pending_count(),
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при отриманні черги модерації: {str(e)}")
+            raise DatabaseError(f"Не вдалося отримати відгуки: {str(e)}")
+    
+    async def get_pending_count(self, force_refresh: bool = False) -> int:
+        """Кількість відгуків у черзі модерації (кешується на короткий час)."""
+        return await pending_count_cache.get(
+            "pending",
+            lambda: self.collection.count_documents({"is_moderated": False}),
+            force_refresh=force_refresh,
+        )
+    
+    async def bulk_moderate_reviews(self, decisions: List[dict]) -> dict:
+        """
+        Масово модерує відгуки.
+        Поточний стан відгуків читається одним запитом, рішення записуються
+        одним bulk_write. Кожна операція умовна: відгук оновлюється, лише якщо
+        його стан модерації та оцінка не змінились після читання. Дельти
+        рейтингу рахуються тільки для операцій, що спрацювали, решта
+        повертається як conflict. Рейтинг кожного зачепленого товару
+        оновлюється один раз сумарною дельтою.
+        """
+        try:
+            results = []
+            valid = {}
+            for decision in decisions:
+                review_id = decision["review_id"]
+                if not ObjectId.is_valid(review_id):
+                    results.append({"review_id": review_id, "result": "invalid_id"})
+                    continue
+                valid[ObjectId(review_id)] = decision
+            
+            existing = await self.collection.find(
+                {"_id": {"$in": list(valid)}},
+                BULK_MODERATION_PROJECTION,
+            ).to_list(length=None)
+            existing_by_id = {review["_id"]: review for review in existing}
+            
+            now = datetime.utcnow()
+            # Мітка запиту: за нею визначаються операції, що спрацювали
+            batch_id = ObjectId()
+            operations = []
+            planned = []
+            for oid, decision in valid.items():
+                review = existing_by_id.get(oid)
+                if review is None:
+                    results.append({"review_id": str(oid), "result": "not_found"})
+                    continue
+                
+                update_data = {
+                    "is_moderated": True,
+                    "is_approved": decision["is_approved"],
+                    "moderator_comment": decision.get("moderator_comment"),
+                    "updated_at": now,
+                }
+                operations.append(UpdateOne(
+                    {
+                        "_id": oid,
+                        "is_moderated": review.get("is_moderated"),
+                        "is_approved": review.get("is_approved"),
+                        "rating": review.get("rating"),
+                    },
+                    {"$set": {**update_data, "moderation_batch_id": batch_id}},
+                ))
+                planned.append((review, update_data))
+            
+            matched_ids = {review["_id"] for review, _ in planned}
+            if operations:
+                result = await self.collection.bulk_write(operations, ordered=False)
+                if result.matched_count < len(operations):
+                    # Частину відгуків змінили паралельно - перечитуємо, які оновлено цим запитом
+                    applied = await self.collection.find(
+                        {"_id": {"$in": list(matched_ids)}, "moderation_batch_id": batch_id},
+                        {"_id": 1},
+                    ).to_list(length=None)
+                    matched_ids = {review["_id"] for review in applied}
+            
+            deltas = {}
+            for review, update_data in planned:
+                if review["_id"] not in matched_ids:
+                    results.append({"review_id": str(review["_id"]), "result": "conflict"})
+                    continue
+                updated_review = {**review, **update_data}
+                self._accumulate_rating_deltas(deltas, review, updated_review)
+                await self._index_duplicate(updated_review, text_changed=False)
+                results.append({
+                    "review_id": str(review["_id"]),
+                    "result": "approved" if update_data["is_approved"] else "rejected",
+                })
+            
+            moderated = len(matched_ids)
+            if moderated:
+                await self._apply_product_rating_deltas(deltas)
+                pending_count_cache.invalidate()
+            
+            logger.info(f"Масово змодеровано {moderated} відгуків ({len(deltas)} товарів)")
+            
+            return {
+                "moderated": moderated,
+                "conflicts": len(planned) - moderated,
+                "products_updated": len(deltas),
+                "results": results,
+            }
+            
+        except Exception as e:
+            logger.error(f"Помилка при масовій модерації відгуків: {str(e)}")
+            raise DatabaseError(f"Не вдалося змодерувати відгуки: {str(e)}")
+    
+    async def get_duplicate_cluster(self, cluster_id: str, pending_only: bool = True) -> List[dict]:
+        """
+        Отримує відгуки кластера майже однакових відгуків.
+        """
+        try:
+            query = {"duplicate_cluster_id": cluster_id}
+            if pending_only:
+                query["is_moderated"] = False
+            
+            reviews = await self.collection.find(query).sort(PENDING_REVIEWS_SORT).limit(
+                CLUSTER_MODERATION_LIMIT
+            ).to_list(length=CLUSTER_MODERATION_LIMIT)
+            return [self._serialize_review(r) for r in reviews]
+            
+        except Exception as e:
+            logger.error(f"Помилка при отриманні кластера відгуків {cluster_id}: {str(e)}")
+            raise DatabaseError(f"Не вдалося отримати відгуки: {str(e)}")
+    
+    async def moderate_duplicate_cluster(
+        self,
+        cluster_id: str,
+        is_approved: bool,
+        moderator_comment: Optional[str] = None,
+    ) -> dict:
+        """
+        Модерує всі немодеровані відгуки кластера одним рішенням
+        (через масову модерацію).
+        """
+        reviews = await self.collection.find(
+            {"duplicate_cluster_id": cluster_id, "is_moderated": False},
+            {"_id": 1},
+        ).limit(CLUSTER_MODERATION_LIMIT).to_list(length=CLUSTER_MODERATION_LIMIT)
+        
+        if not reviews:
+            raise NotFoundError("Кластер відгуків", cluster_id)
+        
+        decisions = [
+            {
+                "review_id": str(review["_id"]),
+                "is_approved": is_approved,
+                "moderator_comment": moderator_comment,
+            }
+            for review in reviews
+        ]
+        result = await self.bulk_moderate_reviews(decisions)
+        result["cluster_id"] = cluster_id
+        return result
+    
+    @staticmethod
+    async def _index_duplicate(review: dict, removed: bool = False, text_changed: bool = True):
+        """
+        Синхронізує відгук з індексом дублікатів: відхилені та видалені
+        відгуки прибираються, решта (пере)індексуються за поточним текстом.
+        Якщо текст не змінився, а відгук уже в індексі, сигнатура не перераховується.
+        """
+        review_id = str(review["_id"])
+        if removed or (review.get("is_moderated") and not review.get("is_approved")):
+            duplicate_index.remove(review_id)
+            return
+        if not text_changed and review_id in duplicate_index:
+            return
+        signature = await run_in_threadpool(duplicate_index.signature, review.get("comment") or "")
+        duplicate_index.add(review_id, signature, review.get("duplicate_cluster_id") or review_id)
+    
+    async def load_duplicate_index(self) -> int:
+        """
+        Завантажує індекс дублікатів зі схвалених та немодерованих відгуків.
+        Запускається у фоні при старті додатку: сигнатури обчислюються
+        пачками в пулі потоків, а до завершення дедуплікація вимкнена.
+        """
+        duplicate_index_state["ready"] = False
+        duplicate_index.clear()
+        cursor = self.collection.find(
+            {"$or": [{"is_approved": True}, {"is_moderated": False}]},
+            {"comment": 1, "duplicate_cluster_id": 1},
+        ).batch_size(DUPLICATE_INDEX_BATCH_SIZE)
+        
+        def signatures(batch: List[dict]) -> list:
+            return [duplicate_index.signature(review.get("comment") or "") for review in batch]
+        
+        batch = []
+        async for review in cursor:
+            batch.append(review)
+            if len(batch) >= DUPLICATE_INDEX_BATCH_SIZE:
+                self._add_duplicate_batch(batch, await run_in_threadpool(signatures, batch))
+                batch = []
+        if batch:
+            self._add_duplicate_batch(batch, await run_in_threadpool(signatures, batch))
+        
+        duplicate_index_state["ready"] = True
+        logger.info(f"Індекс дублікатів відгуків завантажено ({len(duplicate_index)} відгуків)")
+        return len(duplicate_index)
+    
+    @staticmethod
+    def _add_duplicate_batch(batch: List[dict], signatures: list):
+        """Додає пачку відгуків з уже обчисленими сигнатурами в індекс."""
+        for review, signature in zip(batch, signatures):
+            review_id = str(review["_id"])
+            # Відгук, змінений під час завантаження, уже проіндексований актуально
+            if review_id not in duplicate_index:
+                duplicate_index.add(review_id, signature, review.get("duplicate_cluster_id") or review_id)
+    
     async def moderate_review(
         self, 
         review_id: str, 
@@ -225,10 +710,6 @@ class ReviewService:
             if not ObjectId.is_valid(review_id):
                 raise ValidationError(f"Невірний ID відгуку: {review_id}")
             
-            review = await self.collection.find_one({"_id": ObjectId(review_id)})
-            if not review:
-                raise NotFoundError("Відгук", review_id)
-            
             update_data = {
                 "is_moderated": True,
                 "is_approved": is_approved,
@@ -236,18 +717,24 @@ class ReviewService:
                 "updated_at": datetime.utcnow()
             }
             
-            await self.collection.update_one(
+            review = await self.collection.find_one_and_update(
                 {"_id": ObjectId(review_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE,
             )
+            if not review:
+                raise NotFoundError("Відгук", review_id)
+            
+            updated_review = {**review, **update_data}
             
             # Оновлюємо рейтинг товару
-            await self._update_product_rating(review["product_id"])
+            await self._apply_rating_change(review, updated_review)
+            await self._index_duplicate(updated_review, text_changed=False)
+            pending_count_cache.invalidate()
             
-            updated_review = await self.get_review_by_id(review_id)
             logger.info(f"Відгук {review_id} {'схвалено' if is_approved else 'відхилено'} модератором")
             
-            return updated_review
+            return self._serialize_review(updated_review)
             
         except (NotFoundError, ValidationError):
             raise
@@ -255,41 +742,215 @@ class ReviewService:
             logger.error(f"Помилка при модерації відгуку {review_id}: {str(e)}")
             raise DatabaseError(f"Не вдалося змодерувати відгук: {str(e)}")
     
-    async def _update_product_rating(self, product_id: str):
+    @staticmethod
+    def _rating_contribution(review: Optional[dict]) -> tuple:
+        """Внесок відгуку в рейтинг товару: (сума оцінок, кількість)."""
+        if not review or not review.get("is_approved"):
+            return 0.0, 0
+        return review["rating"], 1
+    
+    @classmethod
+    def _accumulate_rating_deltas(cls, deltas: dict, before: Optional[dict], after: Optional[dict]):
         """
-        Оновлює середній рейтинг товару на основі схвалених відгуків.
+        Додає різницю внесків відгуку (до та після зміни) до накопичених дельт по товарах.
         """
-        try:
-            # Отримуємо всі схвалені відгуки для товару
-            approved_reviews = await self.collection.find({
-                "product_id": product_id,
-                "is_approved": True
-            }).to_list(length=None)
-            
-            if not approved_reviews:
-                # Якщо немає схвалених відгуків, скидаємо рейтинг
-                await self.db.products.update_one(
-                    {"_id": ObjectId(product_id)},
-                    {"$set": {"rating": 0.0, "rating_count": 0}}
-                )
-                return
-            
-            # Обчислюємо середній рейтинг
-            total_rating = sum(r["rating"] for r in approved_reviews)
-            rating_count = len(approved_reviews)
-            average_rating = round(total_rating / rating_count, 2)
-            
-            # Оновлюємо товар
-            await self.db.products.update_one(
+        review = before or after
+        entry = deltas.setdefault(review["product_id"], {
+            "sum": 0.0,
+            "count": 0,
+            "histogram": {},
+            "added": [],
+            "removed": [],
+        })
+        before_sum, before_count = cls._rating_contribution(before)
+        after_sum, after_count = cls._rating_contribution(after)
+        entry["sum"] += after_sum - before_sum
+        entry["count"] += after_count - before_count
+        
+        # Останні відгуки в review_summary: прибираємо стару версію, додаємо нову
+        if before_count:
+            entry["removed"].append(str(before["_id"]))
+        if after_count:
+            entry["added"].append(review_summary_item(after))
+        
+        histogram = entry["histogram"]
+        if before_count:
+            star = rating_star(before_sum)
+            histogram[star] = histogram.get(star, 0) - 1
+        if after_count:
+            star = rating_star(after_sum)
+            histogram[star] = histogram.get(star, 0) + 1
+    
+    async def _apply_product_rating_deltas(self, deltas: dict):
+        """
+        Застосовує накопичені дельти рейтингу та review_summary: одне
+        pipeline-оновлення на товар, всі товари - одним bulk_write.
+        """
+        latest_limit = settings.REVIEW_SUMMARY_LATEST_COUNT
+        operations = [
+            UpdateOne(
                 {"_id": ObjectId(product_id)},
-                {"$set": {
-                    "rating": average_rating,
-                    "rating_count": rating_count
-                }}
+                rating_delta_pipeline(entry["sum"], entry["count"], entry["histogram"])
+                + review_summary_pipeline(
+                    entry["count"], entry["sum"], entry["added"], entry["removed"], latest_limit,
+                ),
             )
+            for product_id, entry in deltas.items()
+            if ObjectId.is_valid(product_id)
+            and (entry["sum"] or entry["count"] or entry["added"] or entry["removed"])
+        ]
+        if not operations:
+            return
+        
+        try:
+            await self.db.products.bulk_write(operations, ordered=False)
             
+            # Якщо відгук зник з останніх, список міг стати коротшим - доповнюємо його
+            shrunk = [ObjectId(pid) for pid, entry in deltas.items() if entry["removed"] and ObjectId.is_valid(pid)]
+            if shrunk:
+                await self._refill_review_summaries(shrunk)
         except Exception as e:
-            logger.error(f"Помилка при оновленні рейтингу товару {product_id}: {str(e)}")
+            logger.error(f"Помилка при оновленні рейтингу товарів {list(deltas)}: {str(e)}")
+    
+    async def _refill_review_summaries(self, product_ids: List[ObjectId]):
+        """
+        Доповнює review_summary.latest з колекції відгуків для товарів,
+        у яких список коротший, ніж має бути.
+        """
+        latest_limit = settings.REVIEW_SUMMARY_LATEST_COUNT
+        short = await self.db.products.find(
+            {
+                "_id": {"$in": product_ids},
+                "$expr": {"$lt": [
+                    {"$size": {"$ifNull": ["$review_summary.latest", []]}},
+                    {"$min": [latest_limit, {"$ifNull": ["$review_summary.count", 0]}]},
+                ]},
+            },
+            {"_id": 1},
+        ).to_list(length=None)
+        
+        for product in short:
+            product_id = str(product["_id"])
+            latest = await self.collection.find(
+                {"product_id": product_id, "is_approved": True},
+            ).sort([("created_at", -1), ("_id", -1)]).limit(latest_limit).to_list(length=latest_limit)
+            await self.db.products.update_one(
+                {"_id": product["_id"]},
+                {"$set": {"review_summary.latest": [review_summary_item(r) for r in latest]}},
+            )
+    
+    async def _apply_rating_change(self, before: Optional[dict], after: Optional[dict]):
+        """
+        Застосовує до рейтингу товару різницю внесків відгуку до та після зміни.
+        Одне атомарне оновлення товару замість перерахунку всіх відгуків.
+        """
+        deltas = {}
+        self._accumulate_rating_deltas(deltas, before, after)
+        await self._apply_product_rating_deltas(deltas)
+    
+    async def recalculate_product_ratings(self, product_id: Optional[str] = None) -> int:
+        """
+        Перераховує внесок схвалених відгуків у rating_sum, rating_count,
+        rating, rating_histogram та review_summary з нуля (backfill та
+        виправлення розбіжностей). Оцінки з rate_product та початкові рейтинги
+        товару зберігаються (див. recalculated_rating_pipeline); товари без
+        внеску відгуків не змінюються.
+        Якщо product_id не вказано - для всіх товарів.
+        Повертає кількість товарів, що мають схвалені відгуки.
+        """
+        match = {"is_approved": True}
+        if product_id:
+            match["product_id"] = product_id
+        
+        # Одна $group агрегація: кількість відгуків для кожної пари (товар, оцінка)
+        rows = await self.collection.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {"product_id": "$product_id", "rating": "$rating"},
+                "count": {"$sum": 1},
+            }},
+        ]).to_list(length=None)
+        
+        aggregates = {}
+        for row in rows:
+            row_product_id = row["_id"]["product_id"]
+            rating = row["_id"]["rating"]
+            if not ObjectId.is_valid(row_product_id) or rating is None:
+                continue
+            entry = aggregates.setdefault(row_product_id, {
+                "rating_sum": 0.0,
+                "rating_count": 0,
+                "rating_histogram": dict(EMPTY_RATING_HISTOGRAM),
+            })
+            entry["rating_sum"] += rating * row["count"]
+            entry["rating_count"] += row["count"]
+            entry["rating_histogram"][rating_star(rating)] += row["count"]
+        
+        # Останні схвалені відгуки кожного товару для review_summary
+        latest_limit = settings.REVIEW_SUMMARY_LATEST_COUNT
+        latest_rows = await self.collection.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$product_id",
+                "latest": {"$topN": {
+                    "n": latest_limit,
+                    "sortBy": {"created_at": -1, "_id": -1},
+                    "output": {
+                        "_id": "$_id",
+                        "user_name": "$user_name",
+                        "rating": "$rating",
+                        "comment": "$comment",
+                        "created_at": "$created_at",
+                    },
+                }},
+            }},
+        ]).to_list(length=None)
+        latest_by_product = {
+            row["_id"]: [review_summary_item(r) for r in row["latest"]]
+            for row in latest_rows
+        }
+        
+        rated_ids = []
+        operations = []
+        for row_product_id, entry in aggregates.items():
+            rated_ids.append(ObjectId(row_product_id))
+            average = round(entry["rating_sum"] / entry["rating_count"], 2)
+            operations.append(UpdateOne(
+                {"_id": ObjectId(row_product_id)},
+                recalculated_rating_pipeline(
+                    entry["rating_sum"],
+                    entry["rating_count"],
+                    entry["rating_histogram"],
+                    {
+                        "count": entry["rating_count"],
+                        "rating_sum": entry["rating_sum"],
+                        "average": average,
+                        "latest": latest_by_product.get(row_product_id, []),
+                    },
+                ),
+            ))
+        
+        # Товари, у яких залишився внесок відгуків, а схвалених відгуків вже немає
+        # (оцінки з rate_product та початкові рейтинги зберігаються)
+        reset_filter = {"_id": {"$nin": rated_ids}, "review_summary.count": {"$gt": 0}}
+        if product_id:
+            reset_filter = (
+                {"_id": ObjectId(product_id), "review_summary.count": {"$gt": 0}}
+                if not rated_ids else None
+            )
+        if reset_filter is not None:
+            operations.append(UpdateMany(
+                reset_filter,
+                recalculated_rating_pipeline(
+                    0.0, 0, {}, {"count": 0, "rating_sum": 0.0, "average": 0.0, "latest": []},
+                ),
+            ))
+        
+        if operations:
+            await self.db.products.bulk_write(operations, ordered=False)
+        
+        logger.info(f"Перераховано рейтинги товарів за відгуками (товарів з відгуками: {len(rated_ids)})")
+        return len(rated_ids)
 
 
 def get_review_service() -> ReviewService:
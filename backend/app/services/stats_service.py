@@ -0,0 +1,363 @@
+"""
+Сервіс для статистики адмін панелі.
+
+Лічильники дашборду зберігаються в колекції stats (документ "dashboard")
+і оновлюються через $inc в OrderService, ProductService та AuthService.
+Періодична звірка перераховує їх агрегаціями та виправляє розбіжності.
+"""
+import asyncio
+from datetime import datetime
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from loguru import logger
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.database import MongoDB
+from app.models.order import ORDER_STATUSES
+from app.core.exceptions import DatabaseError
+from app.core.db_monitoring import tag_service_methods
+from app.core.timing import timed
+from app.utils.cache import SingleFlightCache
+
+
+# Поріг, нижче якого залишок товару вважається низьким
+LOW_STOCK_THRESHOLD = 10
+
+# Кількість останніх замовлень на дашборді
+RECENT_ORDERS_LIMIT = 5
+
+# ID документа з лічильниками дашборду
+DASHBOARD_COUNTERS_ID = "dashboard"
+
+# Кількість спроб умовного запису звірки (лічильники змінюються під час агрегацій)
+RECONCILE_ATTEMPTS = 3
+
+# Спільний (в межах процесу) кеш відповіді для адмін дашборду
+admin_stats_cache = SingleFlightCache(
+    ttl=settings.ADMIN_STATS_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ADMIN_STATS_CACHE_STALE_SECONDS,
+    name="admin_stats",
+)
+
+
+@tag_service_methods
+class StatsService:
+    """Сервіс для обчислення статистики адмін панелі."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.stats
+
+    @staticmethod
+    @timed("serialize")
+    def _serialize_recent_order(order: dict) -> dict:
+        """Серіалізує замовлення для блоку останніх замовлень."""
+        return {
+            "id": str(order["_id"]),
+            "order_status": order.get("order_status", "new"),
+            "payment_status": order.get("payment_status", "pending"),
+            "total_amount": order.get("total_amount", 0.0),
+            "created_at": order.get("created_at").isoformat() if order.get("created_at") else None,
+            "email": order.get("email", ""),
+        }
+
+    # Внески окремих документів у лічильники
+
+    @staticmethod
+    def order_counters(order: Optional[dict]) -> dict:
+        """Повертає внесок замовлення у лічильники дашборду."""
+        if not order:
+            return {}
+        amount = order.get("total_amount", 0.0)
+        order_status = order.get("order_status", "new")
+        payment_status = order.get("payment_status", "pending")
+        return {
+            "orders_total": 1,
+            f"orders_by_status.{order_status}": 1,
+            f"orders_by_payment.{payment_status}": 1,
+            "revenue_total": amount,
+            f"revenue_by_payment.{payment_status}": amount,
+        }
+
+    @staticmethod
+    def product_counters(product: Optional[dict]) -> dict:
+        """Повертає внесок товару у лічильники дашборду."""
+        if not product:
+            return {}
+        is_active = product.get("is_active") is True
+        stock = product.get("stock")
+        is_low_stock = is_active and isinstance(stock, (int, float)) and stock < LOW_STOCK_THRESHOLD
+        return {
+            "products_total": 1,
+            "products_active": 1 if is_active else 0,
+            "products_low_stock": 1 if is_low_stock else 0,
+        }
+
+    @staticmethod
+    def user_counters(user: Optional[dict]) -> dict:
+        """Повертає внесок користувача у лічильники дашборду."""
+        if not user:
+            return {}
+        return {
+            "users_total": 1,
+            "users_admins": 1 if user.get("is_admin") is True else 0,
+        }
+
+    @staticmethod
+    def diff_counters(before: dict, after: dict) -> dict:
+        """Різниця внесків документа до та після зміни (для $inc)."""
+        deltas = dict(after)
+        for key, value in before.items():
+            deltas[key] = deltas.get(key, 0) - value
+        return {key: value for key, value in deltas.items() if value}
+
+    async def increment_counters(self, deltas: dict):
+        """
+        Застосовує $inc до лічильників дашборду та збільшує version
+        (за нею звірка визначає, що лічильники змінились під час агрегацій).
+        Помилки не перериваються - розбіжності виправить звірка.
+        """
+        if not deltas:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": DASHBOARD_COUNTERS_ID},
+                {"$inc": {**deltas, "version": 1}},
+            )
+        except Exception as e:
+            logger.warning(f"Не вдалося оновити лічильники дашборду: {str(e)}")
+
+    # Повний перерахунок лічильників агрегаціями
+
+    async def _aggregate_order_counters(self) -> dict:
+        """
+        Обчислює всі лічильники замовлень однією $facet агрегацією.
+        """
+        pipeline = [
+            {"$project": {"order_status": 1, "payment_status": 1, "total_amount": 1}},
+            {"$facet": {
+                "by_status": [
+                    {"$group": {"_id": "$order_status", "count": {"$sum": 1}}},
+                ],
+                "by_payment": [
+                    {"$group": {
+                        "_id": "$payment_status",
+                        "count": {"$sum": 1},
+                        "revenue": {"$sum": "$total_amount"},
+                    }},
+                ],
+            }},
+        ]
+
+        result = await self.db.orders.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {"by_status": [], "by_payment": []}
+
+        return {
+            "orders_total": sum(row["count"] for row in facets["by_payment"]),
+            "orders_by_status": {row["_id"]: row["count"] for row in facets["by_status"] if row["_id"]},
+            "orders_by_payment": {row["_id"]: row["count"] for row in facets["by_payment"] if row["_id"]},
+            "revenue_total": sum(row["revenue"] for row in facets["by_payment"]),
+            "revenue_by_payment": {row["_id"]: row["revenue"] for row in facets["by_payment"] if row["_id"]},
+        }
+
+    async def _aggregate_product_counters(self) -> dict:
+        """
+        Обчислює лічильники товарів однією агрегацією.
+        """
+        is_active = {"$eq": ["$is_active", True]}
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [is_active, 1, 0]}},
+                "low_stock": {"$sum": {"$cond": [
+                    {"$and": [
+                        is_active,
+                        {"$isNumber": "$stock"},
+                        {"$lt": ["$stock", LOW_STOCK_THRESHOLD]},
+                    ]},
+                    1,
+                    0,
+                ]}},
+            }},
+        ]
+
+        result = await self.db.products.aggregate(pipeline).to_list(length=1)
+        row = result[0] if result else {}
+
+        return {
+            "products_total": row.get("total", 0),
+            "products_active": row.get("active", 0),
+            "products_low_stock": row.get("low_stock", 0),
+        }
+
+    async def _aggregate_user_counters(self) -> dict:
+        """
+        Обчислює лічильники користувачів однією агрегацією.
+        """
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "admins": {"$sum": {"$cond": [{"$eq": ["$is_admin", True]}, 1, 0]}},
+            }},
+        ]
+
+        result = await self.db.users.aggregate(pipeline).to_list(length=1)
+        row = result[0] if result else {}
+
+        return {
+            "users_total": row.get("total", 0),
+            "users_admins": row.get("admins", 0),
+        }
+
+    async def _reconciled_since(self, started: datetime) -> Optional[dict]:
+        """Документ лічильників, якщо його звірила паралельна звірка після started."""
+        current = await self.collection.find_one({"_id": DASHBOARD_COUNTERS_ID})
+        reconciled_at = current.get("reconciled_at") if current else None
+        if reconciled_at and reconciled_at >= started:
+            logger.info("Лічильники дашборду щойно звірено паралельно")
+            return current
+        return None
+
+    async def reconcile_counters(self) -> dict:
+        """
+        Перераховує лічильники дашборду з колекцій та перезаписує документ stats.
+        Три агрегації виконуються паралельно.
+
+        Запис умовний: документ замінюється, лише якщо його version не змінилась
+        з моменту читання перед агрегаціями (кожен $inc з increment_counters
+        збільшує version). Якщо під час агрегацій лічильники змінились,
+        звірка повторюється; $inc сервісів не втрачаються і не рахуються двічі.
+        """
+        for _attempt in range(RECONCILE_ATTEMPTS):
+            started = datetime.utcnow()
+            previous = await self.collection.find_one({"_id": DASHBOARD_COUNTERS_ID})
+
+            order_counters, product_counters, user_counters = await asyncio.gather(
+                self._aggregate_order_counters(),
+                self._aggregate_product_counters(),
+                self._aggregate_user_counters(),
+            )
+
+            counters = {
+                **order_counters,
+                **product_counters,
+                **user_counters,
+                "reconciled_at": datetime.utcnow(),
+            }
+
+            if previous is None:
+                try:
+                    await self.collection.insert_one({"_id": DASHBOARD_COUNTERS_ID, **counters, "version": 1})
+                except DuplicateKeyError:
+                    # Документ щойно створила паралельна звірка
+                    concurrent = await self._reconciled_since(started)
+                    if concurrent:
+                        return concurrent
+                    continue
+                logger.info("Лічильники дашборду створено")
+                return counters
+
+            # version=None збігається і з документом без поля version
+            version = previous.get("version")
+            result = await self.collection.replace_one(
+                {"_id": DASHBOARD_COUNTERS_ID, "version": version},
+                {**counters, "version": (version or 0) + 1},
+            )
+            if not result.matched_count:
+                concurrent = await self._reconciled_since(started)
+                if concurrent:
+                    return concurrent
+                continue
+
+            def normalize(value):
+                # Нульові лічильники в словниках еквівалентні відсутнім
+                if isinstance(value, dict):
+                    return {k: v for k, v in value.items() if v}
+                return value or 0
+
+            drift = {
+                key: (previous.get(key), value)
+                for key, value in counters.items()
+                if key != "reconciled_at" and normalize(previous.get(key)) != normalize(value)
+            }
+            if drift:
+                logger.warning(f"Звірка лічильників дашборду виправила розбіжності: {drift}")
+
+            logger.info("Лічильники дашборду звірено")
+            return counters
+
+        logger.warning(
+            f"Лічильники дашборду змінювались під час кожної з {RECONCILE_ATTEMPTS} спроб звірки - "
+            "звірку відкладено до наступного запуску"
+        )
+        return counters
+
+    async def get_admin_stats(self, force_refresh: bool = False) -> dict:
+        """
+        Отримує статистику для адмін панелі через кеш.
+        force_refresh=True оминає кеш (ручне оновлення дашборду).
+        """
+        return await admin_stats_cache.get(
+            "admin_stats",
+            self._compute_admin_stats,
+            force_refresh=force_refresh,
+        )
+
+    async def _compute_admin_stats(self) -> dict:
+        """
+        Обчислює статистику для адмін панелі з матеріалізованих лічильників.
+        Якщо лічильників ще немає - виконує звірку.
+        """
+        try:
+            counters, recent_orders = await asyncio.gather(
+                self.collection.find_one({"_id": DASHBOARD_COUNTERS_ID}),
+                self.db.orders.find({}).sort("created_at", -1).limit(RECENT_ORDERS_LIMIT).to_list(
+                    length=RECENT_ORDERS_LIMIT
+                ),
+            )
+
+            if counters is None:
+                counters = await self.reconcile_counters()
+
+            by_status = counters.get("orders_by_status", {})
+            by_payment = counters.get("orders_by_payment", {})
+            revenue_total = counters.get("revenue_total", 0.0)
+            revenue_paid = counters.get("revenue_by_payment", {}).get("paid", 0.0)
+
+            return {
+                "orders": {
+                    "total": counters.get("orders_total", 0),
+                    "by_status": {status: by_status.get(status, 0) for status in ORDER_STATUSES},
+                    "paid": by_payment.get("paid", 0),
+                    "pending": by_payment.get("pending", 0),
+                },
+                "revenue": {
+                    "total": revenue_total,
+                    "paid": revenue_paid,
+                    "pending": revenue_total - revenue_paid,
+                },
+                "products": {
+                    "total": counters.get("products_total", 0),
+                    "active": counters.get("products_active", 0),
+                    "low_stock": counters.get("products_low_stock", 0),
+                },
+                "users": {
+                    "total": counters.get("users_total", 0),
+                    "admins": counters.get("users_admins", 0),
+                },
+                "recent_orders": [self._serialize_recent_order(o) for o in recent_orders],
+                "generated_at": datetime.utcnow().isoformat(),
+            }
+
+        except Exception as e:
+            logger.error(f"Помилка при отриманні статистики: {str(e)}")
+            raise DatabaseError(f"Не вдалося отримати статистику: {str(e)}")
+
+
+def get_stats_service() -> StatsService:
+    """Отримує екземпляр StatsService."""
+    db = MongoDB.get_database()
+    return StatsService(db)
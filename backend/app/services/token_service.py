@@ -0,0 +1,220 @@
+"""
+Сервіс для refresh токенів: видача, ротація, виявлення повторного
+використання та відкликання сесій.
+
+Кожен вхід створює сесію (sid) з абсолютним терміном дії
+(REFRESH_TOKEN_EXPIRE_DAYS): ротація не продовжує сесію. Refresh токени
+сесії зберігаються в колекції refresh_tokens (TTL індекс по expires_at) і є
+одноразовими: при оновленні токен позначається використаним і замінюється
+новим. Протягом REFRESH_TOKEN_REUSE_GRACE_SECONDS повторне використання
+обміняного токена (паралельні оновлення з кількох вкладок) повертає той самий
+наступний токен; пізніше повторне використання відкликає всю сесію.
+
+Відкликані сесії записуються в revoked_sessions (живуть, поки можуть бути
+дійсні access токени сесії) і синхронізуються в пам'ять кожного воркера,
+тому перевірка access токена не потребує запиту до БД. При відкликанні
+(у воркері, що його виконав, та при синхронізації в інших) з кешів процесу
+прибираються перевірені токени сесій та стан їх користувачів.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import MongoDB
+from app.core.exceptions import UnauthorizedError
+from app.core.db_monitoring import tag_service_methods
+from app.models.auth import TokenData, TokenResponse
+from app.utils.security import (
+    create_access_token,
+    create_refresh_token,
+    revoke_sessions,
+)
+
+
+def _invalidate_user_states(user_ids):
+    """Скидає закешований стан користувачів з відкликаними сесіями."""
+    # auth_service імпортує TokenService, тому імпорт - всередині функції
+    from app.services.auth_service import invalidate_user_auth
+
+    for user_id in set(user_ids):
+        invalidate_user_auth(user_id)
+
+
+@tag_service_methods
+class TokenService:
+    """Сервіс для сесій та refresh токенів."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.refresh_tokens
+        self.revoked = db.revoked_sessions
+
+    async def _issue(
+        self,
+        user_id: str,
+        email: str,
+        is_admin: bool,
+        sid: str,
+        session_expires_at: datetime,
+        jti: Optional[str] = None,
+        store: bool = True,
+    ) -> TokenResponse:
+        """
+        Створює пару токенів сесії та зберігає refresh токен.
+        Refresh токен діє до кінця сесії (session_expires_at).
+        store=False - лише повторно підписує вже збережений токен jti.
+        """
+        jti = jti or uuid.uuid4().hex
+        token_data = {"sub": user_id, "email": email, "is_admin": is_admin, "sid": sid}
+
+        access_token = create_access_token(
+            token_data,
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        refresh_token = create_refresh_token({**token_data, "jti": jti}, expires_at=session_expires_at)
+
+        if store:
+            await self.collection.insert_one({
+                "_id": jti,
+                "sid": sid,
+                "user_id": user_id,
+                "used_at": None,
+                "successor_jti": None,
+                "revoked": False,
+                "created_at": datetime.utcnow(),
+                "expires_at": session_expires_at,
+            })
+
+        return TokenResponse(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_type="bearer",
+        )
+
+    async def create_session(self, user: dict) -> TokenResponse:
+        """Створює нову сесію для користувача (при вході)."""
+        return await self._issue(
+            str(user["_id"]),
+            user["email"],
+            user.get("is_admin", False),
+            sid=uuid.uuid4().hex,
+            session_expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+
+    async def rotate(self, token_data: TokenData) -> TokenResponse:
+        """
+        Обмінює декодований refresh токен на нову пару токенів.
+        Старий токен позначається використаним атомарно разом з jti
+        наступного токена, тому кожен токен обмінюється лише один раз.
+        Повторний обмін протягом REFRESH_TOKEN_REUSE_GRACE_SECONDS повертає
+        того самого наступника; пізніший - вважається викраденням.
+        """
+        if token_data.jti is None or token_data.sid is None:
+            # Токени, видані до появи сесій, не підтримують ротацію
+            raise UnauthorizedError("Невірний або прострочений refresh token")
+
+        now = datetime.utcnow()
+        successor_jti = uuid.uuid4().hex
+        consumed = await self.collection.find_one_and_update(
+            {"_id": token_data.jti, "used_at": None, "revoked": False},
+            {"$set": {"used_at": now, "successor_jti": successor_jti}},
+        )
+
+        if consumed is not None:
+            return await self._issue(
+                token_data.user_id,
+                token_data.email,
+                token_data.is_admin,
+                sid=token_data.sid,
+                session_expires_at=consumed["expires_at"],
+                jti=successor_jti,
+            )
+
+        stored = await self.collection.find_one({"_id": token_data.jti})
+        if stored is None or stored.get("revoked") or stored.get("used_at") is None:
+            raise UnauthorizedError("Невірний або прострочений refresh token")
+
+        grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        if stored.get("successor_jti") and now - stored["used_at"] <= grace:
+            # Паралельне оновлення (кілька вкладок): той самий наступний токен
+            return await self._issue(
+                token_data.user_id,
+                token_data.email,
+                token_data.is_admin,
+                sid=token_data.sid,
+                session_expires_at=stored["expires_at"],
+                jti=stored["successor_jti"],
+                store=False,
+            )
+
+        # Токен вже обміняли давно - ймовірно, його викрадено
+        logger.warning(
+            f"Повторне використання refresh токена сесії {token_data.sid} "
+            f"користувача {token_data.user_id}, сесію відкликано"
+        )
+        await self.revoke_session(token_data.sid, token_data.user_id)
+        raise UnauthorizedError("Невірний або прострочений refresh token")
+
+    async def revoke_session(self, sid: str, user_id: str):
+        """
+        Відкликає сесію: всі її refresh токени та access токени
+        (через набір відкликаних сесій).
+        """
+        now = datetime.utcnow()
+        await self.collection.update_many({"sid": sid}, {"$set": {"revoked": True}})
+        # Access токени сесії живуть не довше ACCESS_TOKEN_EXPIRE_MINUTES
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        await self.revoked.update_one(
+            {"_id": sid},
+            {"$set": {"user_id": user_id, "revoked_at": now, "expires_at": expires_at}},
+            upsert=True,
+        )
+        revoke_sessions({sid: expires_at})
+        _invalidate_user_states([user_id])
+        logger.info(f"Сесію {sid} користувача {user_id} відкликано")
+
+    async def revoke_user_sessions(self, user_id: str) -> int:
+        """Відкликає всі активні сесії користувача."""
+        sids = await self.collection.distinct("sid", {"user_id": user_id, "revoked": False})
+        if not sids:
+            return 0
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        await self.collection.update_many({"sid": {"$in": sids}}, {"$set": {"revoked": True}})
+        await self.revoked.bulk_write([
+            UpdateOne(
+                {"_id": sid},
+                {"$set": {"user_id": user_id, "revoked_at": now, "expires_at": expires_at}},
+                upsert=True,
+            )
+            for sid in sids
+        ], ordered=False)
+        revoke_sessions({sid: expires_at for sid in sids})
+        _invalidate_user_states([user_id])
+        logger.info(f"Відкликано {len(sids)} сесій користувача {user_id}")
+        return len(sids)
+
+    async def sync_revocations(self) -> int:
+        """
+        Завантажує відкликані сесії з БД у пам'ять процесу
+        (щоб відкликання в одному воркері діяло в усіх). Для нових
+        відкликань скидаються закешовані токени та стан користувачів.
+        """
+        rows = await self.revoked.find(
+            {"expires_at": {"$gt": datetime.utcnow()}},
+            {"expires_at": 1, "user_id": 1},
+        ).to_list(length=None)
+        newly_revoked = revoke_sessions({row["_id"]: row["expires_at"] for row in rows}, replace=True)
+        _invalidate_user_states(row["user_id"] for row in rows if row["_id"] in newly_revoked and row.get("user_id"))
+        return len(rows)
+
+
+def get_token_service() -> TokenService:
+    """Отримує екземпляр TokenService."""
+    db = MongoDB.get_database()
+    return TokenService(db)
@@ -0,0 +1,172 @@
+"""
+Кеші в пам'яті процесу.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from loguru import logger
+
+
+# Позначка відсутнього значення (None може бути закешованим значенням)
+MISSING = object()
+
+
+class SingleFlightCache:
+    """
+    Асинхронний кеш з TTL, stale-while-revalidate та single-flight.
+
+    - Свіже значення (молодше за ttl) повертається одразу.
+    - Застаріле значення (молодше за ttl + stale_ttl) повертається одразу,
+      а оновлення запускається у фоні.
+    - Одночасні промахи по одному ключу об'єднуються в одне обчислення.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, name: str = "cache"):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Запускає обчислення значення, якщо воно ще не виконується."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        async def load():
+            try:
+                value = await loader()
+                self._entries[key] = (value, time.monotonic())
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(load())
+        self._inflight[key] = task
+        return task
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Оновлює застаріле значення у фоні, логуючи помилки."""
+        if key in self._inflight:
+            return
+
+        def log_error(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Фонове оновлення кешу {self.name} не вдалося: {task.exception()}")
+
+        self._start_load(key, loader).add_done_callback(log_error)
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        force_refresh: bool = False,
+    ) -> Any:
+        """
+        Повертає значення з кешу або обчислює його через loader.
+        force_refresh=True оминає кеш (але приєднується до вже запущеного обчислення).
+        """
+        if not force_refresh:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = time.monotonic() - loaded_at
+                if age < self.ttl:
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._refresh_in_background(key, loader)
+                    return value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Видаляє значення з кешу (або всі значення, якщо key не вказано)."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Статистика використання кешу."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+class TTLCache:
+    """
+    Синхронний LRU кеш з обмеженим розміром та TTL для кожного запису.
+    Найдавніше використаний запис витісняється при перевищенні maxsize.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Повертає значення або MISSING, якщо запису немає чи він прострочений."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Зберігає значення (ttl за замовчуванням - з конструктора)."""
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Видаляє значення з кешу (або всі значення, якщо key не вказано)."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Видаляє записи, значення яких задовольняє predicate. Повертає кількість."""
+        keys = [key for key, (value, _expires_at) in self._entries.items() if predicate(value)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Статистика використання кешу."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,129 @@
+"""
+MinHash / LSH індекс у пам'яті процесу для пошуку майже однакових текстів.
+
+Текст розбивається на символьні шингли, для кожного тексту обчислюється
+MinHash сигнатура фіксованої довжини. Сигнатура ділиться на
+смуги (bands): тексти, що збіглися хоча б в одній смузі, стають кандидатами,
+а схожість кандидата оцінюється часткою однакових значень сигнатури
+(наближення коефіцієнта Жаккара). Вартість запиту не залежить від розміру індексу.
+"""
+import hashlib
+import random
+import re
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+# Просте число Мерсенна 2^61 - 1 для універсального хешування
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _hash_shingle(shingle: str) -> int:
+    """Стабільний (між процесами) 32-бітний хеш шингла."""
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """
+    Множина шинглів тексту: підрядки з size символів після нормалізації
+    (нижній регістр, лише слова, розділені одним пробілом).
+    Символьні шингли стійкі до дрібних змін: заміни слова, пунктуації, опечаток.
+    """
+    normalized = " ".join(_WORD_RE.findall(text.lower()))
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class MinHashLSH:
+    """
+    LSH індекс MinHash сигнатур.
+
+    Кожен ключ (наприклад, ID відгуку) зберігається разом з сигнатурою та
+    довільною міткою (наприклад, ID кластера дублікатів).
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm має ділитися на bands без остачі")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._buckets: List[Dict[Tuple[int, ...], set]] = [{} for _ in range(bands)]
+        self._entries: Dict[Hashable, Tuple[Tuple[int, ...], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """MinHash сигнатура тексту (None для тексту без слів)."""
+        hashes = [_hash_shingle(s) for s in shingles(text, self.shingle_size)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: Hashable, signature: Optional[Tuple[int, ...]], label: Optional[str] = None):
+        """Додає (або замінює) ключ з сигнатурою та міткою."""
+        self.remove(key)
+        if signature is None:
+            return
+        self._entries[key] = (signature, label)
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """Видаляє ключ з індексу (якщо він є)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band, band_key in self._band_keys(entry[0]):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def best_match(self, signature: Optional[Tuple[int, ...]]) -> Optional[Tuple[Hashable, Optional[str], float]]:
+        """
+        Найбільш схожий ключ серед кандидатів LSH.
+        Повертає (key, label, similarity) або None, якщо кандидатів немає.
+        """
+        if signature is None:
+            return None
+
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            other, label = self._entries[key]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+            if best is None or similarity > best[2]:
+                best = (key, label, similarity)
+        return best
+
+    def clear(self):
+        """Очищає індекс."""
+        self._entries.clear()
+        for buckets in self._buckets:
+            buckets.clear()
@@ -0,0 +1,73 @@
+"""
+Утиліти для keyset (cursor) пагінації.
+"""
+import base64
+from typing import Any, List, Optional, Tuple
+from bson import json_util
+
+from app.core.exceptions import ValidationError
+
+
+SortSpec = List[Tuple[str, int]]
+
+
+def encode_cursor(sort_name: str, document: dict, sort_spec: SortSpec) -> str:
+    """
+    Кодує курсор з значень полів сортування останнього документа сторінки.
+    """
+    values = [document.get(field) for field, _ in sort_spec]
+    raw = json_util.dumps({"s": sort_name, "v": values})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_name: str) -> List[Any]:
+    """
+    Декодує курсор і перевіряє, що він створений для того ж сортування.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        data = json_util.loads(raw)
+        values = data["v"]
+        cursor_sort = data["s"]
+    except Exception:
+        raise ValidationError("Невірний курсор пагінації")
+
+    if cursor_sort != sort_name or not isinstance(values, list):
+        raise ValidationError("Курсор не відповідає обраному сортуванню")
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[dict]:
+    """
+    Умова "значення поля йде після value" у порядку сортування MongoDB
+    (null менший за будь-яке значення).
+    """
+    if direction < 0:
+        if value is None:
+            return None
+        return {"$or": [{field: {"$lt": value}}, {field: None}]}
+    if value is None:
+        return {field: {"$ne": None}}
+    return {field: {"$gt": value}}
+
+
+def keyset_filter(sort_spec: SortSpec, values: List[Any]) -> dict:
+    """
+    Формує фільтр для документів, що йдуть після курсора:
+    (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+    """
+    if len(values) != len(sort_spec):
+        raise ValidationError("Курсор не відповідає обраному сортуванню")
+
+    branches = []
+    for i, (field, direction) in enumerate(sort_spec):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        equal = [{f: values[j]} for j, (f, _) in enumerate(sort_spec[:i])]
+        branches.append({"$and": equal + [after]} if equal else after)
+
+    if not branches:
+        # Після курсора документів немає
+        return {"_id": {"$exists": False}}
+    return {"$or": branches}
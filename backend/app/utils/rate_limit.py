@@ -0,0 +1,172 @@
+"""
+Обмеження частоти запитів (token bucket).
+
+Кожен ключ (наприклад, IP або email) має "відро" з burst токенів, що
+поповнюється зі швидкістю per_minute токенів на хвилину. Запит забирає один
+токен; якщо токенів немає - запит відхиляється з часом до появи токена.
+
+Бекенди:
+- memory: стан у пам'яті воркера (обмежена кількість ключів, LRU);
+- mongo: спільний стан для всіх воркерів у колекції rate_limits
+  (атомарне pipeline-оновлення, TTL індекс прибирає неактивні ключі).
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from pymongo import ReturnDocument
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import MongoDB
+from app.core.exceptions import TooManyRequestsError
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Правило обмеження: ключ, ємність відра та швидкість поповнення."""
+
+    key: str
+    burst: int
+    per_minute: float
+
+
+class MemoryTokenBuckets:
+    """Token bucket у пам'яті процесу."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, rule: RateLimitRule) -> float:
+        """Забирає токен. Повертає 0, якщо дозволено, інакше секунди до наступного токена."""
+        now = time.monotonic()
+        rate = rule.per_minute / 60.0
+        tokens, updated_at = self._buckets.get(rule.key, (float(rule.burst), now))
+        tokens = min(float(rule.burst), tokens + (now - updated_at) * rate)
+
+        retry_after = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            retry_after = (1.0 - tokens) / rate if rate > 0 else 60.0
+
+        self._buckets[rule.key] = (tokens, now)
+        self._buckets.move_to_end(rule.key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoTokenBuckets:
+    """Token bucket у MongoDB, спільний для всіх воркерів."""
+
+    async def take(self, rule: RateLimitRule) -> float:
+        """Забирає токен одним атомарним оновленням (час - годинник сервера БД)."""
+        rate = rule.per_minute / 60.0
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        # Відро повністю наповнюється за burst / rate секунд - після цього запис не потрібен
+        idle_ms = int(rule.burst / rate * 1000) if rate > 0 else 3600 * 1000
+
+        bucket = await MongoDB.get_database().rate_limits.find_one_and_update(
+            {"_id": rule.key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        rule.burst,
+                        {"$add": [{"$ifNull": ["$tokens", rule.burst]}, {"$multiply": [elapsed_seconds, rate]}]},
+                    ]},
+                    "updated_at": "$$NOW",
+                }},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": {"$add": ["$$NOW", idle_ms]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if bucket["allowed"]:
+            return 0.0
+        return (1.0 - bucket["tokens"]) / rate if rate > 0 else 60.0
+
+
+class RateLimiter:
+    """Перевіряє набір правил і відхиляє запит з 429, якщо будь-яке вичерпане."""
+
+    def __init__(self, backend: str):
+        self.backend_name = backend
+        self.memory = MemoryTokenBuckets(settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+        self.backend = MongoTokenBuckets() if backend == "mongo" else self.memory
+        self.rejected = 0
+
+    async def _take(self, rule: RateLimitRule) -> float:
+        try:
+            return await self.backend.take(rule)
+        except Exception as e:
+            # Спільний бекенд недоступний - обмежуємо хоча б у межах воркера
+            logger.warning(f"Rate limit бекенд {self.backend_name} недоступний: {str(e)}")
+            return await self.memory.take(rule)
+
+    async def enforce(self, rules: List[RateLimitRule]):
+        """
+        Перевіряє правила по черзі (зупиняється на першому вичерпаному).
+        Викидає TooManyRequestsError з Retry-After.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        for rule in rules:
+            retry_after = await self._take(rule)
+            if retry_after > 0:
+                self.rejected += 1
+                logger.warning(f"Перевищено ліміт запитів: {rule.key} (retry {retry_after:.1f}s)")
+                raise TooManyRequestsError(retry_after)
+
+
+def hashed_key(prefix: str, value: str) -> str:
+    """Ключ з хешем значення (email тощо не зберігаються у відкритому вигляді)."""
+    digest = hashlib.sha256(value.strip().lower().encode("utf-8")).hexdigest()[:32]
+    return f"{prefix}:{digest}"
+
+
+def client_ip(request) -> str:
+    """IP клієнта (з X-Forwarded-For, якщо API стоїть за довіреним проксі)."""
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded: Optional[str] = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def login_rules(ip: str, email: str) -> List[RateLimitRule]:
+    """Правила для входу: спершу за IP, потім за email."""
+    return [
+        RateLimitRule(
+            f"login:ip:{ip}",
+            settings.RATE_LIMIT_LOGIN_IP_BURST,
+            settings.RATE_LIMIT_LOGIN_IP_PER_MINUTE,
+        ),
+        RateLimitRule(
+            hashed_key("login:email", email),
+            settings.RATE_LIMIT_LOGIN_EMAIL_BURST,
+            settings.RATE_LIMIT_LOGIN_EMAIL_PER_MINUTE,
+        ),
+    ]
+
+
+def register_rules(ip: str) -> List[RateLimitRule]:
+    """Правила для реєстрації: за IP."""
+    return [
+        RateLimitRule(
+            f"register:ip:{ip}",
+            settings.RATE_LIMIT_REGISTER_IP_BURST,
+            settings.RATE_LIMIT_REGISTER_IP_PER_MINUTE,
+        ),
+    ]
+
+
+# Спільний (в межах процесу) обмежувач
+rate_limiter = RateLimiter(settings.RATE_LIMIT_BACKEND)
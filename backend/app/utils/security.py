@@ -1,14 +1,42 @@
 """
 Утиліти для безпеки: JWT токени та хешування паролів.
 """
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set
 from jose import JWTError, jwt
 import bcrypt
 from loguru import logger
 
 from app.core.config import settings
 from app.models.auth import TokenData
+from app.utils.cache import MISSING, TTLCache
+
+
+# Обмежений пул потоків для bcrypt: хешування не блокує event loop,
+# а кількість одночасних хешувань не перевищує кількість потоків
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt",
+)
+
+# Кеш перевірених токенів: sha256(token) -> (тип токена, TokenData).
+# Запис живе не довше, ніж exp токена
+_token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    name="decoded_tokens",
+)
+
+# Сумарний час повного декодування (для оцінки зекономленого CPU)
+_decode_stats = {"decodes": 0, "decode_seconds": 0.0}
+
+# Відкликані сесії: sid -> час, після якого access токени сесії вже прострочені.
+# Синхронізується з БД фоновою задачею, тому перевірка токена не читає БД
+_revoked_sessions: Dict[str, datetime] = {}
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -38,14 +66,54 @@ def get_password_hash(password: str) -> str:
     if isinstance(password, str):
         password = password.encode('utf-8')
     
-    # Генеруємо сіль та хешуємо
-    salt = bcrypt.gensalt()
+    # Генеруємо сіль з налаштованою вартістю та хешуємо
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password, salt)
     
     # Повертаємо як строку
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Перевіряє чи хеш створено з іншою вартістю, ніж налаштована BCRYPT_ROUNDS.
+    Формат bcrypt хешу: $2b$<rounds>$<salt+hash>.
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Перевіряє пароль у пулі потоків, не блокуючи event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Хешує пароль у пулі потоків, не блокуючи event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+def shutdown_password_executor():
+    """Зупиняє пул потоків хешування (при зупинці додатку)."""
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def reset_password_executor():
+    """
+    Створює новий пул потоків хешування.
+    Потоки не переживають fork, тому воркер має власний пул.
+    """
+    global _password_executor
+    _password_executor = ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix="bcrypt",
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Створює JWT access token.
@@ -62,37 +130,141 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def create_refresh_token(data: dict) -> str:
+def create_refresh_token(data: dict, expires_at: Optional[datetime] = None) -> str:
     """
     Створює JWT refresh token.
+    expires_at - абсолютний кінець сесії (за замовчуванням REFRESH_TOKEN_EXPIRE_DAYS від зараз).
     """
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = expires_at or datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def decode_token(token: str, token_type: str = "access") -> Optional[TokenData]:
+def _token_digest(token: str) -> str:
+    """Ключ кешу токена (сам токен у пам'яті не зберігається)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _decode_token_uncached(token: str, token_type: str) -> Optional[TokenData]:
     """
-    Декодує JWT token і повертає TokenData або None.
+    Перевіряє підпис і claims токена та кешує результат до його exp.
     """
+    started = time.perf_counter()
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        
-        # Перевіряємо тип токена
-        if payload.get("type") != token_type:
-            logger.warning(f"Невірний тип токена. Очікувався {token_type}, отримано {payload.get('type')}")
-            return None
-        
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        is_admin: bool = payload.get("is_admin", False)
-        
-        if user_id is None or email is None:
-            return None
-        
-        return TokenData(user_id=user_id, email=email, is_admin=is_admin)
     except JWTError as e:
         logger.warning(f"Помилка декодування токена: {str(e)}")
         return None
+    finally:
+        _decode_stats["decodes"] += 1
+        _decode_stats["decode_seconds"] += time.perf_counter() - started
+    
+    # Перевіряємо тип токена
+    if payload.get("type") != token_type:
+        logger.warning(f"Невірний тип токена. Очікувався {token_type}, отримано {payload.get('type')}")
+        return None
+    
+    user_id: str = payload.get("sub")
+    email: str = payload.get("email")
+    is_admin: bool = payload.get("is_admin", False)
+    
+    if user_id is None or email is None:
+        return None
+    
+    token_data = TokenData(
+        user_id=user_id,
+        email=email,
+        is_admin=is_admin,
+        sid=payload.get("sid"),
+        jti=payload.get("jti"),
+    )
+    
+    if settings.TOKEN_CACHE_ENABLED and payload.get("exp") is not None:
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            _token_cache.set(_token_digest(token), (token_type, token_data), ttl=ttl)
+    
+    return token_data
+
+
+def decode_token(token: str, token_type: str = "access") -> Optional[TokenData]:
+    """
+    Декодує JWT token і повертає TokenData або None.
+    Успішно перевірені токени кешуються до закінчення їх exp.
+    Токени відкликаних сесій відхиляються (і з кешу теж).
+    """
+    token_data = MISSING
+    if settings.TOKEN_CACHE_ENABLED:
+        cached = _token_cache.get(_token_digest(token))
+        if cached is not MISSING:
+            cached_type, token_data = cached
+            if cached_type != token_type:
+                logger.warning(f"Невірний тип токена. Очікувався {token_type}, отримано {cached_type}")
+                return None
+    
+    if token_data is MISSING:
+        token_data = _decode_token_uncached(token, token_type)
+    
+    if token_data is not None and is_session_revoked(token_data.sid):
+        return None
+    return token_data
+
+
+def invalidate_token_cache(token: Optional[str] = None):
+    """
+    Прибирає токен (або всі токени) з кешу перевірених токенів.
+    Повністю кеш скидається після fork воркера; токени відкликаних сесій
+    прибирає revoke_sessions.
+    """
+    _token_cache.invalidate(_token_digest(token) if token is not None else None)
+
+
+def invalidate_session_tokens(sids: Set[str]) -> int:
+    """Прибирає з кешу перевірені токени сесій sids."""
+    if not sids:
+        return 0
+    return _token_cache.invalidate_where(lambda entry: entry[1].sid in sids)
+
+
+def is_session_revoked(sid: Optional[str]) -> bool:
+    """Перевіряє чи сесію відкликано (лише пам'ять процесу)."""
+    return sid is not None and sid in _revoked_sessions
+
+
+def revoke_sessions(revoked: Dict[str, datetime], replace: bool = False) -> Set[str]:
+    """
+    Додає відкликані сесії до набору в пам'яті та прибирає їх токени з кешу.
+    replace=True замінює весь набір (синхронізація з БД).
+    Повертає сесії, яких ще не було в наборі процесу.
+    """
+    newly_revoked = set(revoked) - set(_revoked_sessions)
+    invalidate_session_tokens(newly_revoked)
+    if replace:
+        _revoked_sessions.clear()
+    _revoked_sessions.update(revoked)
+    
+    # Прибираємо сесії, чиї access токени вже прострочені
+    now = datetime.utcnow()
+    for sid in [sid for sid, expires_at in _revoked_sessions.items() if expires_at <= now]:
+        del _revoked_sessions[sid]
+    return newly_revoked
+
+
+def revoked_sessions_count() -> int:
+    """Кількість відкликаних сесій у пам'яті процесу."""
+    return len(_revoked_sessions)
+
+
+def token_cache_stats() -> dict:
+    """Статистика кешу токенів та оцінка зекономленого часу CPU."""
+    stats = _token_cache.stats()
+    decodes = _decode_stats["decodes"]
+    avg_decode_ms = _decode_stats["decode_seconds"] / decodes * 1000 if decodes else 0.0
+    return {
+        **stats,
+        "decodes": decodes,
+        "avg_decode_ms": round(avg_decode_ms, 4),
+        "cpu_saved_ms": round(stats["hits"] * avg_decode_ms, 2),
+    }
@@ -0,0 +1,64 @@
+"""
+Конфігурація gunicorn для продакшн запуску:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Воркери uvicorn (uvloop + httptools з uvicorn[standard]), перезапуск воркерів
+після max_requests, graceful shutdown. Значення беруться з Settings (.env).
+"""
+import multiprocessing
+import os
+import shutil
+
+from app.core.config import settings
+
+# Метрики воркерів агрегуються через спільний каталог; очищаємо його до
+# завантаження додатку, щоб не змішувати значення попереднього запуску
+if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+    shutil.rmtree(settings.METRICS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = settings.METRICS_MULTIPROC_DIR
+
+
+def _workers() -> int:
+    """Кількість воркерів: WEB_WORKERS або CPU * WEB_WORKERS_PER_CORE."""
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    workers = max(1, int(multiprocessing.cpu_count() * settings.WEB_WORKERS_PER_CORE))
+    if settings.WEB_MAX_WORKERS > 0:
+        workers = min(workers, settings.WEB_MAX_WORKERS)
+    return workers
+
+
+bind = settings.WEB_BIND
+workers = _workers()
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = settings.WEB_MAX_REQUESTS_JITTER
+preload_app = settings.WEB_PRELOAD_APP
+
+# Логи запитів пише logging_middleware
+accesslog = None
+errorlog = "-"
+loglevel = settings.LOG_LEVEL.lower()
+
+
+def post_fork(server, worker):
+    """Перестворює стан процесу у воркері (кеші, потоки, логер)."""
+    from app.core.worker import reset_after_fork
+
+    reset_after_fork()
+    server.log.info(f"Воркер {worker.pid} готовий")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Воркер {worker.pid} зупинено")
+
+
+def child_exit(server, worker):
+    """Прибирає live-метрики завершеного воркера (в master процесі)."""
+    from app.core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -182,9 +182,7 @@ async def add_reviews():
         
         # Оновлюємо рейтинги всіх товарів
         logger.info("Оновлюємо рейтинги товарів...")
-        for product in products:
-            product_id = str(product["_id"])
-            await review_service._update_product_rating(product_id)
+        await review_service.recalculate_product_ratings()
         
         logger.success("Рейтинги товарів оновлено")
         
@@ -0,0 +1,120 @@
+"""
+Бенчмарк входу під навантаженням разом з трафіком каталогу.
+
+Паралельно виконує логіни та запити до списку товарів на запущений API
+і виводить затримки каталогу (p50/p95/max) та пропускну здатність логінів.
+Якщо bcrypt блокує event loop, затримки каталогу ростуть разом з логінами.
+
+Використання:
+    python scripts/benchmark_login.py [base_url] [секунд] [паралельних_логінів] [паралельних_каталогу]
+    python scripts/benchmark_login.py http://localhost:8000 20 8 16
+
+Потрібен існуючий користувач (за замовчуванням demo@powercore.com з create_demo_users).
+
+Сервер треба запускати з RATE_LIMIT_ENABLED=false: ліміт логінів на email
+(RATE_LIMIT_LOGIN_EMAIL_BURST) та на IP вичерпується за перші секунди, і
+далі бенчмарк вимірював би швидкі відповіді 429 замість bcrypt. Перед
+замірами скрипт перевіряє це серією логінів і завершується, якщо отримав 429.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+
+EMAIL = os.getenv("BENCH_EMAIL", "demo@powercore.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "demo12345")
+# Кількість логінів перевірки - більше за типовий burst ліміту на email
+PREFLIGHT_LOGINS = 8
+
+
+async def _worker(client: httpx.AsyncClient, request, deadline: float, latencies: list, errors: list):
+    """Виконує запити до дедлайну, записуючи затримки."""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await request(client)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+def _report(name: str, latencies: list, errors: list, duration: float):
+    """Виводить статистику затримок."""
+    if not latencies:
+        print(f"{name}: немає успішних запитів (помилок: {len(errors)})")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{name}: {len(latencies)} запитів, {len(latencies) / duration:.1f}/с, "
+        f"p50 {statistics.median(ordered):.1f} мс, p95 {p95:.1f} мс, max {ordered[-1]:.1f} мс, "
+        f"помилок {len(errors)}"
+    )
+
+
+async def _check_rate_limit_disabled(client: httpx.AsyncClient) -> bool:
+    """Перевіряє, що сервер не обмежує логіни (інакше заміри некоректні)."""
+    for _ in range(PREFLIGHT_LOGINS):
+        response = await client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        if response.status_code == 429:
+            print(
+                "Сервер обмежує частоту логінів (429). Запустіть API з "
+                "RATE_LIMIT_ENABLED=false і повторіть бенчмарк."
+            )
+            return False
+        if response.status_code >= 400:
+            print(f"Логін {EMAIL} не вдався ({response.status_code}): перевірте BENCH_EMAIL/BENCH_PASSWORD")
+            return False
+    return True
+
+
+async def benchmark_login(base_url: str, duration: float, login_concurrency: int, catalog_concurrency: int):
+    """Запускає бенчмарк: спочатку лише каталог, потім каталог разом з логінами."""
+
+    def login(client):
+        return client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+
+    def catalog(client):
+        return client.get("/api/v1/products", params={"limit": 20})
+
+    limits = httpx.Limits(max_connections=login_concurrency + catalog_concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        if not await _check_rate_limit_disabled(client):
+            sys.exit(1)
+
+        for phase, logins in (("Лише каталог", 0), ("Каталог + логіни", login_concurrency)):
+            catalog_latencies, catalog_errors = [], []
+            login_latencies, login_errors = [], []
+            deadline = time.perf_counter() + duration
+
+            workers = [
+                _worker(client, catalog, deadline, catalog_latencies, catalog_errors)
+                for _ in range(catalog_concurrency)
+            ] + [
+                _worker(client, login, deadline, login_latencies, login_errors)
+                for _ in range(logins)
+            ]
+            await asyncio.gather(*workers)
+
+            print(f"\n== {phase} ({duration:.0f} с) ==")
+            _report("Каталог", catalog_latencies, catalog_errors, duration)
+            if logins:
+                _report("Логін", login_latencies, login_errors, duration)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(benchmark_login(
+        base_url=args[0] if len(args) > 0 else "http://localhost:8000",
+        duration=float(args[1]) if len(args) > 1 else 20.0,
+        login_concurrency=int(args[2]) if len(args) > 2 else 8,
+        catalog_concurrency=int(args[3]) if len(args) > 3 else 16,
+    ))
@@ -0,0 +1,68 @@
+"""
+Скрипт для перевірки, що паралельні оцінки товару не втрачаються.
+Створює тимчасовий товар, виконує N одночасних rate_product і перевіряє
+rating_count та rating_sum, після чого видаляє товар.
+
+Використання:
+    python scripts/check_rating_concurrency.py [кількість_оцінок]
+"""
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import MongoDB
+from app.services.product_service import ProductService
+from loguru import logger
+
+
+async def check_rating_concurrency(votes: int = 500):
+    """Перевіряє відсутність втрачених оцінок при паралельному навантаженні."""
+    product_id = None
+    try:
+        await MongoDB.connect()
+        logger.info("Підключено до MongoDB")
+
+        db = MongoDB.get_database()
+        product_service = ProductService(db)
+
+        result = await db.products.insert_one({
+            "name": "Rating concurrency check",
+            "price": 1.0,
+            "stock": 0,
+            "is_active": False,
+            "rating": 0.0,
+            "rating_count": 0,
+            "rating_sum": 0.0,
+        })
+        product_id = str(result.inserted_id)
+
+        ratings = [random.choice([1.0, 2.0, 3.0, 4.0, 5.0]) for _ in range(votes)]
+        await asyncio.gather(*(product_service.rate_product(product_id, r) for r in ratings))
+
+        product = await db.products.find_one({"_id": result.inserted_id})
+        expected_sum = sum(ratings)
+
+        if product["rating_count"] == votes and abs(product["rating_sum"] - expected_sum) < 1e-6:
+            logger.success(
+                f"OK: {votes} паралельних оцінок, rating_count={product['rating_count']}, "
+                f"rating={product['rating']}"
+            )
+        else:
+            logger.error(
+                f"Втрачено оцінки: очікувалось count={votes}, sum={expected_sum}; "
+                f"отримано count={product['rating_count']}, sum={product['rating_sum']}"
+            )
+            sys.exit(1)
+
+    finally:
+        if product_id:
+            await MongoDB.get_database().products.delete_one({"_id": result.inserted_id})
+        await MongoDB.disconnect()
+        logger.info("Відключено від MongoDB")
+
+
+if __name__ == "__main__":
+    asyncio.run(check_rating_concurrency(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,71 @@
+"""
+Скрипт для пошуку повторних відгуків одного користувача на один товар.
+Такі відгуки не дозволяють створити унікальний індекс product_user_unique.
+
+Використання:
+    python scripts/find_duplicate_user_reviews.py        # лише звіт
+    python scripts/find_duplicate_user_reviews.py --fix  # залишити найновіший відгук
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import MongoDB
+from app.core.indexes import ensure_indexes
+from app.services.review_service import ReviewService
+from loguru import logger
+
+
+async def find_duplicate_user_reviews(fix: bool = False):
+    """Знаходить (та за потреби видаляє) повторні відгуки."""
+    try:
+        await MongoDB.connect()
+        logger.info("Підключено до MongoDB")
+        db = MongoDB.get_database()
+
+        duplicates = await db.reviews.aggregate([
+            {"$match": {"user_id": {"$type": "string"}}},
+            {"$sort": {"created_at": -1, "_id": -1}},
+            {"$group": {
+                "_id": {"product_id": "$product_id", "user_id": "$user_id"},
+                "review_ids": {"$push": "$_id"},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ]).to_list(length=None)
+
+        if not duplicates:
+            logger.success("Повторних відгуків не знайдено")
+            return
+
+        for group in duplicates:
+            logger.warning(
+                f"Товар {group['_id']['product_id']}, користувач {group['_id']['user_id']}: "
+                f"{group['count']} відгуків"
+            )
+
+        if not fix:
+            logger.info(f"Знайдено груп: {len(duplicates)}. Запустіть з --fix, щоб залишити найновіші")
+            return
+
+        # Залишаємо найновіший відгук кожної групи
+        extra_ids = [review_id for group in duplicates for review_id in group["review_ids"][1:]]
+        result = await db.reviews.delete_many({"_id": {"$in": extra_ids}})
+        logger.info(f"Видалено повторних відгуків: {result.deleted_count}")
+
+        await ReviewService(db).recalculate_product_ratings()
+        await ensure_indexes(db)
+        logger.success("Рейтинги перераховано, індекси створено")
+
+    except Exception as e:
+        logger.error(f"Помилка: {e}")
+        raise
+    finally:
+        await MongoDB.disconnect()
+        logger.info("Відключено від MongoDB")
+
+
+if __name__ == "__main__":
+    asyncio.run(find_duplicate_user_reviews(fix="--fix" in sys.argv))
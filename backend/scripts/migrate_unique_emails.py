@@ -0,0 +1,123 @@
+"""
+Скрипт міграції перед створенням унікального індексу email_unique_ci.
+
+Знаходить користувачів, чиї email збігаються без урахування регістру.
+Групування виконується з тією ж collation, що й індекс (EMAIL_COLLATION),
+тому звіт збігається з тим, що відхилить побудова індексу.
+
+Без --apply лише виводить план: який акаунт у кожній групі залишається
+(за замовчуванням найстаріший, або вказаний через --keep), які дублікати
+буде видалено (лише без замовлень і відгуків) і які конфлікти потребують
+ручного розв'язання. З --apply видаляє заплановані дублікати та створює індекси.
+
+Використання:
+    python scripts/migrate_unique_emails.py                      # лише план
+    python scripts/migrate_unique_emails.py --keep <user_id>     # залишити вказаний акаунт (можна кілька разів)
+    python scripts/migrate_unique_emails.py --apply [--keep ...] # видалити дублікати з плану
+"""
+import asyncio
+import sys
+from pathlib import Path
+from typing import List, Set
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import MongoDB
+from app.core.indexes import EMAIL_COLLATION, ensure_indexes
+from app.services.stats_service import StatsService
+from loguru import logger
+
+
+def _parse_keep(args: List[str]) -> Set[str]:
+    """ID акаунтів з --keep <user_id>."""
+    return {args[i + 1] for i, arg in enumerate(args[:-1]) if arg == "--keep"}
+
+
+async def migrate_unique_emails(apply: bool = False, keep: Set[str] = frozenset()):
+    """Звітує про дублікати email та за потреби прибирає безпечні."""
+    try:
+        await MongoDB.connect()
+        logger.info("Підключено до MongoDB")
+        db = MongoDB.get_database()
+
+        groups = await db.users.aggregate(
+            [
+                {"$sort": {"created_at": 1, "_id": 1}},
+                {"$group": {
+                    "_id": "$email",
+                    "users": {"$push": {"_id": "$_id", "email": "$email", "created_at": "$created_at"}},
+                    "count": {"$sum": 1},
+                }},
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            collation=EMAIL_COLLATION,
+        ).to_list(length=None)
+
+        if not groups:
+            logger.success("Дублікатів email не знайдено")
+
+        removable = []
+        conflicts = 0
+        for group in groups:
+            users = group["users"]
+            chosen = [user for user in users if str(user["_id"]) in keep]
+            if len(chosen) > 1:
+                conflicts += 1
+                logger.error(
+                    f"Email {group['_id']}: --keep вказано для кількох акаунтів групи "
+                    f"({', '.join(str(user['_id']) for user in chosen)}) - залиште один"
+                )
+                continue
+
+            keeper = chosen[0] if chosen else users[0]
+            logger.warning(
+                f"Email {group['_id']}: {group['count']} акаунтів, залишаємо {keeper['_id']} "
+                f"({keeper['email']}, створено {keeper.get('created_at')}"
+                f"{', --keep' if chosen else ', найстаріший'})"
+            )
+            for user in users:
+                if user is keeper:
+                    continue
+                user_id = str(user["_id"])
+                orders = await db.orders.count_documents({"user_id": user_id}, limit=1)
+                reviews = await db.reviews.count_documents({"user_id": user_id}, limit=1)
+                if orders or reviews:
+                    conflicts += 1
+                    logger.error(
+                        f"  Конфлікт: {user_id} ({user['email']}) має замовлення або відгуки - "
+                        f"потрібне ручне об'єднання"
+                    )
+                else:
+                    removable.append(user["_id"])
+                    logger.info(f"  Буде видалено: {user_id} ({user['email']}, створено {user.get('created_at')})")
+
+        if not apply:
+            if groups:
+                logger.info(
+                    f"Груп: {len(groups)}, буде видалено: {len(removable)}, конфліктів: {conflicts}. "
+                    f"Перевірте план і запустіть з --apply (інший акаунт групи - через --keep <user_id>)"
+                )
+            return
+
+        if removable:
+            result = await db.users.delete_many({"_id": {"$in": removable}})
+            logger.info(f"Видалено акаунтів-дублікатів: {result.deleted_count}")
+            await StatsService(db).reconcile_counters()
+
+        if conflicts:
+            logger.error(f"Залишилось конфліктів: {conflicts}. Індекс email_unique_ci не буде створено")
+            return
+
+        await ensure_indexes(db)
+        logger.success("Індекс email_unique_ci створено")
+
+    except Exception as e:
+        logger.error(f"Помилка: {e}")
+        raise
+    finally:
+        await MongoDB.disconnect()
+        logger.info("Відключено від MongoDB")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_unique_emails(apply="--apply" in sys.argv, keep=_parse_keep(sys.argv[1:])))
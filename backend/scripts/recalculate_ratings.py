@@ -0,0 +1,41 @@
+"""
+Скрипт для перерахунку внеску схвалених відгуків у рейтинги та гістограми
+оцінок товарів з нуля. Оцінки з rate_product та початкові рейтинги зберігаються.
+Використовується для backfill гістограм та виправлення розбіжностей.
+
+Використання:
+    python scripts/recalculate_ratings.py              # всі товари
+    python scripts/recalculate_ratings.py <product_id> # один товар
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import MongoDB
+from app.services.review_service import ReviewService
+from loguru import logger
+
+
+async def recalculate_ratings(product_id: str | None = None):
+    """Перераховує рейтинги товарів."""
+    try:
+        await MongoDB.connect()
+        logger.info("Підключено до MongoDB")
+
+        review_service = ReviewService(MongoDB.get_database())
+        rated = await review_service.recalculate_product_ratings(product_id)
+
+        logger.success(f"Рейтинги перераховано. Товарів зі схваленими відгуками: {rated}")
+
+    except Exception as e:
+        logger.error(f"Помилка: {e}")
+        raise
+    finally:
+        await MongoDB.disconnect()
+        logger.info("Відключено від MongoDB")
+
+
+if __name__ == "__main__":
+    asyncio.run(recalculate_ratings(sys.argv[1] if len(sys.argv) > 1 else None))
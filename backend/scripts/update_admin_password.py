@@ -1,5 +1,7 @@
 """
 Скрипт для оновлення пароля адміна.
+Після зміни пароля всі сесії адміна відкликаються (воркери API підхоплять
+відкликання при синхронізації та скинуть закешовані токени).
 """
 
 import asyncio
@@ -10,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.core.database import MongoDB
 from app.services.auth_service import AuthService
+from app.services.token_service import TokenService
 from app.utils.security import get_password_hash
 from loguru import logger
 
@@ -36,7 +39,8 @@ async def update_admin_password():
             {"$set": {"hashed_password": new_password_hash}}
         )
         
-        logger.success("Пароль адміна оновлено на: admin12345")
+        revoked = await TokenService(db).revoke_user_sessions(str(admin["_id"]))
+        logger.success(f"Пароль адміна оновлено на: admin12345 (відкликано сесій: {revoked})")
 
     except Exception as e:
         logger.error(f"Помилка: {e}")
@@ -404,6 +404,7 @@ async def seed_products():
                 **product,
                 "rating": rating,
                 "rating_count": rating_count,
+                "rating_sum": rating * rating_count,
                 "created_at": now,
                 "updated_at": now,
             }